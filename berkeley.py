@@ -0,0 +1,168 @@
+"""
+Berkeley funding sheet helpers.
+
+The sheet has one row per funding line item (Legend, Source) and one column
+per year, with actuals up to LAST_ACTUAL_YEAR and forecasts after it. It is
+parsed once per refresh into a BerkeleyIndex keyed by (Legend, Source), and
+reshaped from there into year-sorted long tables and per-source prefix sums,
+so pages look line items up by name and only slice for the selected years.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+from funding import YearRangeIndex
+
+# Last year of actuals; later year columns are forecasts
+LAST_ACTUAL_YEAR = 2024
+
+# Bookkeeping rows that aren't a funding source
+EXCLUDED_SOURCES = ["Finance Data"]
+
+# Sheet source names -> names shown on the dashboard
+SOURCE_NAMES = {
+    'Research (Berkeley only)': 'Berkeley Research Funds',
+    'reports': ' Research Subawards',
+    'Administration fee': 'EBI-Shell Administration fee'
+}
+
+# The individual awarded grant rows are replaced by one row with these totals
+AWARDED_GRANTS = {2024: 3522000}  # Exactly 3.522MM
+
+_YEAR = re.compile(r"\d{4}")
+
+
+def year_columns(df):
+    """
+    The sheet's year columns, in sheet order.
+    """
+    return [col for col in df.columns if _YEAR.fullmatch(str(col))]
+
+
+def clean(df):
+    """
+    The sheet with dashboard source names and the awarded grants combined
+    into one row.
+    """
+    df = df.copy()
+    years = year_columns(df)
+    df['Source'] = df['Source'].replace(SOURCE_NAMES)
+
+    # Combine all Awarded Grants entries into a single row with the correct totals
+    df = df[df['Legend'] != 'Awarded grants']
+    awarded_row = pd.DataFrame({'Legend': ['Awarded grants'], 'Source': ['Awarded grants']})
+    for col in years:
+        awarded_row[col] = AWARDED_GRANTS.get(int(col), 0)
+    return pd.concat([df, awarded_row], ignore_index=True)
+
+
+class BerkeleyIndex:
+    """
+    The cleaned sheet keyed by (Legend, Source), with the year columns as a
+    line items x years matrix (missing amounts are zeros).
+
+    Line items are looked up by key, never by position, so reordering rows in
+    the sheet can't swap two series, and a key that isn't in the sheet (e.g.
+    a renamed Source) raises KeyError. Line items without any funding are
+    kept, with `funded` False.
+    """
+
+    def __init__(self, df):
+        years = year_columns(df)
+        # A line item listed twice counts once, with its amounts summed
+        yearly = df.groupby(['Legend', 'Source'], sort=False)[years].sum(min_count=1)
+        self.keys = yearly.index
+        self.years = np.array([int(year) for year in years])
+        self.matrix = np.nan_to_num(yearly.to_numpy(dtype=float, na_value=np.nan))
+        self.funded = self.matrix.any(axis=1)
+        self._rows = {key: row for row, key in enumerate(self.keys)}
+        self._columns = {year: column for column, year in enumerate(self.years)}
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        return key in self._rows
+
+    @property
+    def sources(self):
+        return self.keys.get_level_values('Source')
+
+    def rows(self, keys, years=None):
+        """
+        Matrix of the given line items (rows, in the order asked) over the
+        given years (all years by default; years not in the sheet are zeros).
+
+        Raises KeyError for line items that aren't in the sheet.
+        """
+        keys = [tuple(key) for key in keys]
+        missing = [key for key in keys if key not in self._rows]
+        if missing:
+            raise KeyError(f"Not in the Berkeley sheet: {missing}")
+        positions = np.array([self._rows[key] for key in keys], dtype=int)
+        if years is None:
+            return self.matrix[positions]
+        columns = np.array([self._columns.get(int(year), -1) for year in years], dtype=int)
+        rows = np.zeros((len(positions), len(columns)))
+        rows[:, columns >= 0] = self.matrix[np.ix_(positions, columns[columns >= 0])]
+        return rows
+
+    def series(self, legend, source, years=None):
+        """
+        One line item's amounts per year.
+        """
+        return pd.Series(self.rows([(legend, source)], years)[0],
+                         index=self.years if years is None else list(years), name=source)
+
+    def frame(self, keys=None, years=None):
+        """
+        Line items x years as a DataFrame indexed by (Legend, Source), with
+        int year columns.
+        """
+        keys = self.keys if keys is None else pd.MultiIndex.from_tuples(keys, names=self.keys.names)
+        return pd.DataFrame(self.rows(keys, years), index=keys,
+                            columns=self.years if years is None else list(years))
+
+
+def in_lookback(df):
+    """
+    Rows shown in the lookback charts: no NSF grants and no bookkeeping rows.
+    """
+    return ~df['Source'].str.contains('NSF', na=False) & ~df['Source'].isin(EXCLUDED_SOURCES)
+
+
+def to_long(index):
+    """
+    One row per funded line item and year (an int), sorted by year.
+    """
+    keys = index.keys[index.funded]
+    # Year columns in ascending order, whatever their order in the sheet
+    order = np.argsort(index.years, kind='stable')
+    matrix = index.matrix[index.funded][:, order]
+    rows, years = matrix.shape
+    return pd.DataFrame({
+        'Legend': np.tile(keys.get_level_values('Legend'), years),
+        'Source': np.tile(keys.get_level_values('Source'), years),
+        'Year': np.repeat(index.years[order], rows),
+        'Funding': matrix.T.ravel(),
+    })
+
+
+def year_slice(long, start, end):
+    """
+    Rows of a year-sorted long table within the inclusive range [start, end].
+    """
+    years = long['Year'].to_numpy()
+    lo, hi = np.searchsorted(years, [start, end + 1])
+    return long.iloc[lo:hi]
+
+
+def source_totals(index):
+    """
+    Prefix sums of funding per Source, for year-range totals of the lookback
+    line items.
+    """
+    yearly = index.frame()
+    yearly = yearly[index.funded & in_lookback(yearly.index.to_frame(index=False)).to_numpy()]
+    return YearRangeIndex(yearly.droplevel('Legend'))
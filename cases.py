@@ -0,0 +1,304 @@
+"""
+Local store for IP cases submitted from the dashboard.
+
+Submitted cases are written to a local SQLite database straight away and move
+through an approval workflow:
+
+    submitted -> approved -> synced
+    submitted -> rejected
+    approved -> rejected
+
+A sync job appends approved cases to the IP sheet in batches, one append per
+batch, filling only the columns the sheet already has and never rewriting its
+existing rows. Until a case is synced, the IP dashboard shows it from the local
+store (see load_pending), so a new case doesn't need a sheet round trip to
+appear.
+
+Run `python cases.py` to sync approved cases out of band (e.g. from cron).
+"""
+import os
+import re
+import sqlite3
+import time
+from pathlib import Path
+
+import pandas as pd
+
+import schema
+
+ROOT = Path(__file__).resolve().parent
+
+DEFAULT_DB = Path(os.environ.get("EBI_CASES_DB", ROOT / "cases.db"))
+
+# Cases appended to the IP sheet per write
+SYNC_BATCH_SIZE = 50
+
+# Sheet columns identifying a case, in order of preference; a case already in
+# the sheet under its key is never appended again
+SYNC_KEYS = ["Case Number", "Patent Title"]
+
+# Status -> statuses it may move to
+TRANSITIONS = {
+    "submitted": {"approved", "rejected"},
+    "approved": {"synced", "rejected"},
+    "rejected": set(),
+    "synced": set(),
+}
+
+# Case field -> IP sheet column
+SHEET_COLUMNS = {
+    "case_no": "Case Number",
+    "title": "Patent Title",
+    "lead_inventor": "PI",
+    "mktg_stat": "Mktg Stat",
+    "pros_stat": "Pros Stat",
+    "filing_type": "Filing Type",
+    "us_app_no": "US Application Number",
+    "us_app_date": "US Application Date",
+    "lead_sponsor": "Lead Sponsor",
+    "lead_inv_dept": "Lead Inv Dept",
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cases (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    case_no TEXT NOT NULL,
+    title TEXT NOT NULL,
+    lead_inventor TEXT,
+    mktg_stat TEXT,
+    pros_stat TEXT,
+    filing_type TEXT,
+    us_app_no TEXT,
+    us_app_date TEXT,
+    lead_sponsor TEXT,
+    lead_inv_dept TEXT,
+    status TEXT NOT NULL DEFAULT 'submitted',
+    created REAL NOT NULL,
+    updated REAL NOT NULL,
+    synced REAL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS cases_case_no ON cases (case_no);
+CREATE INDEX IF NOT EXISTS cases_status ON cases (status);
+"""
+
+
+class CaseStore:
+    """
+    SQLite table of submitted cases and their approval status.
+    """
+
+    def __init__(self, db_path=DEFAULT_DB):
+        self.db_path = Path(db_path)
+        with self._connect() as db:
+            db.executescript(_SCHEMA)
+
+    def _connect(self):
+        db = sqlite3.connect(self.db_path, timeout=30)
+        db.row_factory = sqlite3.Row
+        return db
+
+    def submit(self, **fields):
+        """
+        Store a new case (fields as in SHEET_COLUMNS); returns its id.
+
+        Raises ValueError if the case number or title is missing, or the case
+        number is already taken.
+        """
+        unknown = set(fields) - set(SHEET_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown case fields {sorted(unknown)}")
+        fields = {key: None if value is None else str(value).strip() for key, value in fields.items()}
+        if not fields.get("case_no") or not fields.get("title"):
+            raise ValueError("A case needs a case number and a title")
+
+        now = time.time()
+        columns = list(fields) + ["created", "updated"]
+        try:
+            with self._connect() as db:
+                cursor = db.execute(
+                    f"INSERT INTO cases ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                    list(fields.values()) + [now, now],
+                )
+        except sqlite3.IntegrityError:
+            raise ValueError(f"Case {fields['case_no']} has already been submitted") from None
+        return cursor.lastrowid
+
+    def transition(self, case_nos, status, db=None):
+        """
+        Move cases to a new status, all or none.
+
+        Raises KeyError for an unknown case and ValueError for a move the
+        workflow doesn't allow.
+        """
+        case_nos = [case_nos] if isinstance(case_nos, str) else list(case_nos)
+        if status not in TRANSITIONS:
+            raise ValueError(f"Unknown status '{status}'")
+        own = db is None
+        db = self._connect() if own else db
+        try:
+            placeholders = ", ".join("?" * len(case_nos))
+            current = dict(db.execute(
+                f"SELECT case_no, status FROM cases WHERE case_no IN ({placeholders})", case_nos
+            ).fetchall())
+            for case_no in case_nos:
+                if case_no not in current:
+                    raise KeyError(f"Unknown case {case_no}")
+                if status not in TRANSITIONS[current[case_no]]:
+                    raise ValueError(f"Case {case_no} can't go from {current[case_no]} to {status}")
+            now = time.time()
+            db.execute(
+                f"UPDATE cases SET status = ?, updated = ?{', synced = ?' if status == 'synced' else ''}"
+                f" WHERE case_no IN ({placeholders})",
+                [status, now] + ([now] if status == "synced" else []) + case_nos,
+            )
+            if own:
+                db.commit()
+        finally:
+            if own:
+                db.close()
+
+    def cases(self, statuses=None, limit=None):
+        """
+        Cases with the given statuses (all by default), oldest first.
+        """
+        query = "SELECT * FROM cases"
+        params = []
+        if statuses:
+            query += f" WHERE status IN ({', '.join('?' * len(statuses))})"
+            params = list(statuses)
+        query += " ORDER BY id"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        with self._connect() as db:
+            return pd.read_sql_query(query, db, params=params)
+
+    def status_counts(self):
+        with self._connect() as db:
+            return dict(db.execute("SELECT status, COUNT(*) FROM cases GROUP BY status").fetchall())
+
+    def sync(self, sheet, batch_size=SYNC_BATCH_SIZE):
+        """
+        Append approved cases to the IP sheet, batch_size cases per append.
+
+        `sheet` has header(), column_values(column) and append(rows), like
+        WorksheetTarget. Rows are appended in the sheet's own columns. A case
+        whose key (see SYNC_KEYS) is already in the sheet is marked synced
+        without being appended again, so a rerun after a failure between the
+        append and the status update doesn't duplicate rows. Returns the
+        number of cases appended.
+        """
+        header = sheet.header()
+        key = next((col for col in SYNC_KEYS if col in header), None)
+        if key is None:
+            raise ValueError(f"The IP sheet has none of the columns {SYNC_KEYS}")
+
+        appended = 0
+        while True:
+            batch = self.cases(["approved"], limit=batch_size)
+            if batch.empty:
+                return appended
+            rows = to_sheet_rows(batch)
+            in_sheet = {str(value).strip() for value in sheet.column_values(key)}
+            new = ~rows[key].astype(str).str.strip().isin(in_sheet)
+            if new.any():
+                sheet.append(rows[new].reindex(columns=header))
+                appended += int(new.sum())
+            self.transition(batch["case_no"].tolist(), "synced")
+
+
+class WorksheetTarget:
+    """
+    The IP sheet as a gspread worksheet, for CaseStore.sync.
+    """
+
+    def __init__(self, worksheet):
+        self.worksheet = worksheet
+
+    def header(self):
+        return self.worksheet.row_values(1)
+
+    def column_values(self, column):
+        """
+        Values of a column below the header ([] if there's no such column).
+        """
+        header = self.header()
+        if column not in header:
+            return []
+        return self.worksheet.col_values(header.index(column) + 1)[1:]
+
+    def append(self, rows):
+        """
+        Append rows (a DataFrame in the sheet's column order) after the last
+        row with data, leaving every existing row as it is.
+        """
+        values = rows.astype(object).where(rows.notna(), "").to_numpy().tolist()
+        self.worksheet.append_rows(values, value_input_option="USER_ENTERED")
+
+
+def open_worksheet(config):
+    """
+    The gspread worksheet a GSheets connection's secrets point at: its
+    `worksheet` if set, else the tab in the spreadsheet URL's gid, else the
+    first tab. Writing needs service account credentials; a connection with
+    only a public spreadsheet URL is read-only.
+    """
+    config = dict(config)
+    if config.get("type") != "service_account":
+        raise ValueError(
+            "The IP sheet connection has no service account credentials, so it can only read the "
+            "sheet. Add a service account (type = \"service_account\" and its keys) to its "
+            "[connections] entry in .streamlit/secrets.toml to sync cases."
+        )
+    import gspread
+
+    url = config.pop("spreadsheet")
+    worksheet = config.pop("worksheet", None)
+    spreadsheet = gspread.service_account_from_dict(config).open_by_url(url)
+    if worksheet:
+        return spreadsheet.worksheet(worksheet)
+    gid = re.search(r"[#&?]gid=(\d+)", url)
+    return spreadsheet.get_worksheet_by_id(int(gid.group(1))) if gid else spreadsheet.get_worksheet(0)
+
+
+def to_sheet_rows(cases_df):
+    """
+    Cases as rows of the IP sheet, with Application_YR from the US
+    application date.
+    """
+    rows = cases_df[list(SHEET_COLUMNS)].rename(columns=SHEET_COLUMNS)
+    rows["Application_YR"] = pd.to_datetime(rows["US Application Date"], errors="coerce").dt.year.astype("Int64")
+    return rows
+
+
+def load_pending(store=None):
+    """
+    Submitted and approved cases not yet in the IP sheet, typed like the sheet.
+    """
+    store = store or CaseStore()
+    return schema.ingest("ip", to_sheet_rows(store.cases(["submitted", "approved"])))
+
+
+def sync_to_sheet(store=None, batch_size=SYNC_BATCH_SIZE):
+    """
+    Append approved cases to the IP sheet, then refresh its snapshot and the
+    data cache so the dashboard reads the sheet with them. Returns the number
+    of cases appended.
+    """
+    import streamlit as st
+
+    import data
+
+    store = store or CaseStore()
+    # The GSheets connection only rewrites whole sheets, so append through gspread
+    worksheet = open_worksheet(st.secrets["connections"][data.CONNECTIONS["ip"]])
+    appended = store.sync(WorksheetTarget(worksheet), batch_size)
+    if appended:
+        data.refresh_snapshot("ip")
+        data.clear_cache()
+    return appended
+
+
+if __name__ == "__main__":
+    appended = sync_to_sheet()
+    print(f"Appended {appended} cases to the IP sheet" if appended else "Nothing to sync")
@@ -0,0 +1,99 @@
+"""
+Type-ahead index over the EBI² portfolio companies.
+
+Company names, industries and websites are split into words, and every
+substring of every word is mapped to the companies it occurs in. This is a
+flattened suffix trie: each node is a dict key, so looking up what the user
+has typed so far is one dict lookup per word, however many companies there
+are. Row lists are sorted when the index is built, so suggestions need no
+sorting at query time.
+"""
+import itertools
+import re
+
+import pandas as pd
+
+# Columns searched, with the company name first
+COLUMNS = ["Company", "Primary Industry Code", "Website"]
+
+# Website parts that say nothing about the company
+_URL_NOISE = re.compile(r"^(https?://)?(www\.)?")
+_WORD = re.compile(r"\w+")
+
+
+def words(text, column):
+    """
+    Lowercase words of one cell.
+    """
+    text = str(text).lower()
+    if column == "Website":
+        text = _URL_NOISE.sub("", text)
+    return _WORD.findall(text)
+
+
+class CompanyIndex:
+    """
+    Prefix and infix lookups of companies by name, industry and website.
+    """
+
+    def __init__(self, df, columns=COLUMNS):
+        self.ids = df.index
+        self.names = df["Company"].astype(object).tolist()
+        prefixes = {}
+        infixes = {}
+        for col in [col for col in columns if col in df.columns]:
+            for row, value in enumerate(df[col].astype(object)):
+                if pd.isna(value):
+                    continue
+                for word in words(value, col):
+                    for start in range(len(word)):
+                        for end in range(start + 1, len(word) + 1):
+                            infixes.setdefault(word[start:end], set()).add(row)
+                            if start == 0 and col == "Company":
+                                prefixes.setdefault(word[:end], set()).add(row)
+
+        # Alphabetical by company name within each node
+        order = {row: rank for rank, row in enumerate(
+            sorted(range(len(self.names)), key=lambda row: str(self.names[row]).lower())
+        )}
+        self._prefixes = {key: sorted(rows, key=order.get) for key, rows in prefixes.items()}
+        self._infixes = {key: sorted(rows, key=order.get) for key, rows in infixes.items()}
+
+    def _rows(self, query):
+        # Row positions containing every word of the query, in name order
+        query_words = _WORD.findall(query.lower())
+        if not query_words:
+            return list(range(len(self.names)))
+        postings = [self._infixes.get(word, []) for word in query_words]
+        if len(postings) == 1:
+            return postings[0]
+        shared = set(postings[0]).intersection(*postings[1:])
+        return [row for row in min(postings, key=len) if row in shared]
+
+    def match(self, query):
+        """
+        Index labels of the companies matching every word of the query.
+        """
+        return self.ids[self._rows(query)]
+
+    def suggest(self, query, limit=5):
+        """
+        Up to `limit` distinct company names for the query: names with a word
+        starting with the query's last word first, then names that contain it.
+        """
+        query_words = _WORD.findall(query.lower())
+        rows = self._rows(query)
+        if query_words:
+            # Both lists are in name order and read lazily, so only the first few rows are visited
+            starts = self._prefixes.get(query_words[-1], [])
+            if len(query_words) > 1:
+                matching = set(rows)
+                starts = (row for row in starts if row in matching)
+            rows = itertools.chain(starts, rows)
+        suggestions = []
+        for row in rows:
+            if len(suggestions) == limit:
+                break
+            if self.names[row] not in suggestions:
+                suggestions.append(self.names[row])
+        return suggestions
@@ -0,0 +1,110 @@
+"""
+Crosswalk from funding-sheet PIs to the people on the projects sheet.
+
+The funding sheet names PIs by last name only ("Keasling"), while the projects
+sheet has full names. The crosswalk indexes every person on the projects sheet
+by full and last name once per refresh, so matching a funding PI is a dict
+lookup. A last name shared by two people is ambiguous: it matches nobody
+unless pi_overrides.csv maps it to one of them, so one person's funding is
+never credited to the other.
+"""
+import pandas as pd
+
+from names import load_overrides, normalize_name
+
+# Project columns collected for each person
+PERSON_COLUMNS = ["Institution", "Program", "Discipline", "Sponsor"]
+
+
+class PICrosswalk:
+    """
+    Person records from the projects sheet, indexed by full and last name.
+    """
+
+    def __init__(self, projects_df, overrides=None):
+        self.overrides = load_overrides() if overrides is None else dict(overrides)
+        projects = projects_df.dropna(subset=['Principle Investigator'])
+        # One row per person and project, keyed by canonical name
+        self.projects = pd.DataFrame({
+            'Person': projects['Principle Investigator'].astype(object),
+            **{col: projects[col] for col in PERSON_COLUMNS},
+        }).reset_index(drop=True)
+
+        # Canonical name -> person record
+        self.people = {}
+        for person, rows in self.projects.groupby('Person', sort=False):
+            self.people[person] = {
+                'name': person,
+                'institutions': list(rows['Institution'].dropna().unique()),
+                'programs': list(rows['Program'].dropna().unique()),
+                'disciplines': list(rows['Discipline'].dropna().unique()),
+                'projects': len(rows),
+            }
+
+        # Normalized full name -> canonical name, and last name -> canonical names
+        self._by_full = {}
+        self._by_last = {}
+        for person in self.people:
+            normalized = normalize_name(person)
+            self._by_full[normalized] = person
+            if normalized:
+                self._by_last.setdefault(normalized.split()[-1], []).append(person)
+
+    def candidates(self, pi):
+        """
+        Every person a funding-sheet PI could refer to.
+        """
+        if pd.isna(pi):
+            return []
+        if pi in self.overrides:
+            target = self.overrides[pi]
+            return [target] if target in self.people else []
+        normalized = normalize_name(pi)
+        if normalized in self._by_full:
+            return [self._by_full[normalized]]
+        tokens = normalized.split()
+        return list(self._by_last.get(tokens[-1], [])) if tokens else []
+
+    def lookup(self, pi):
+        """
+        The person record for a funding-sheet PI, or None if the PI is
+        unknown or ambiguous.
+        """
+        candidates = self.candidates(pi)
+        return self.people[candidates[0]] if len(candidates) == 1 else None
+
+    def person_of(self, pi):
+        """
+        Canonical name for a funding-sheet PI (None if unknown or ambiguous).
+        """
+        record = self.lookup(pi)
+        return record['name'] if record else None
+
+    def institution_of(self, pi):
+        """
+        Primary (first listed) institution of a funding-sheet PI.
+        """
+        record = self.lookup(pi)
+        return record['institutions'][0] if record and record['institutions'] else None
+
+    def match(self, pis):
+        """
+        Match funding-sheet PIs, one row per distinct PI with the matched
+        person, the candidate names and a status (matched, ambiguous, unmatched).
+        """
+        rows = []
+        for pi in pd.unique(pd.Series(pis).dropna()):
+            candidates = self.candidates(pi)
+            if len(candidates) == 1:
+                status = 'matched'
+            elif candidates:
+                status = 'ambiguous'
+            else:
+                status = 'unmatched'
+            rows.append({
+                'PI': pi,
+                'Person': candidates[0] if status == 'matched' else None,
+                'Candidates': ', '.join(candidates),
+                'Status': status,
+            })
+        return pd.DataFrame(rows, columns=['PI', 'Person', 'Candidates', 'Status'])
@@ -0,0 +1,164 @@
+"""
+Shared data access for the dashboard pages.
+
+This module owns every Google Sheets connection. Pages should only get data
+through the loaders below so each sheet is fetched at most once per TTL,
+no matter how many pages or sessions ask for it.
+
+Where the data comes from is set by the EBI_DATA_MODE environment variable:
+
+- ``snapshot`` (default): serve the latest local Parquet snapshot and refresh
+  it from the sheet in the background once it is older than CACHE_TTL. Falls
+  back to a live read when no snapshot exists yet.
+- ``live``: always read the sheet, saving a snapshot of every successful read
+  and falling back to the latest snapshot if the sheet can't be reached.
+- ``offline``: only read snapshots (from EBI_SNAPSHOT_DIR), never the sheets.
+"""
+import logging
+import os
+import threading
+import uuid
+
+import streamlit as st
+from streamlit_gsheets import GSheetsConnection
+
+import schema
+from snapshots import SnapshotStore
+
+logger = logging.getLogger(__name__)
+
+# How long (in seconds) a sheet stays cached before it is fetched again
+CACHE_TTL = 600
+
+DATA_MODE = os.environ.get("EBI_DATA_MODE", "snapshot")
+
+store = SnapshotStore()
+
+# Datasets with a background refresh currently running
+_refreshing = set()
+_refresh_lock = threading.Lock()
+
+# Dataset name -> connection name in .streamlit/secrets.toml
+CONNECTIONS = {
+    "dashboard": "gsheets_dashboard",
+    "ip": "gsheets_ip",
+    "funding": "gsheets_funding",
+    "admin": "gsheets_admin",
+    "berkeley": "gsheets_berkeley",
+    "ebi2": "gsheets_ebi2",
+}
+
+
+def read_sheet(dataset):
+    """
+    Read a dataset straight from its Google Sheet, bypassing every cache.
+    """
+    conn = st.connection(CONNECTIONS[dataset], type=GSheetsConnection)
+    # Caching is handled by load_dataset, so skip the connection's own cache
+    return conn.read(ttl=0)
+
+
+def refresh_snapshot(dataset):
+    """
+    Read a dataset from its sheet and store it as a new snapshot.
+    """
+    df = read_sheet(dataset)
+    store.save(dataset, df)
+    return df
+
+
+def _refresh_in_background(dataset):
+    with _refresh_lock:
+        if dataset in _refreshing:
+            return
+        _refreshing.add(dataset)
+
+    def run():
+        try:
+            refresh_snapshot(dataset)
+        except Exception:
+            logger.exception("Background refresh of '%s' failed", dataset)
+        finally:
+            with _refresh_lock:
+                _refreshing.discard(dataset)
+
+    threading.Thread(target=run, name=f"refresh-{dataset}", daemon=True).start()
+
+
+def fetch_dataset(dataset):
+    """
+    Get a dataset according to DATA_MODE, without going through the cache.
+    """
+    if DATA_MODE == "offline":
+        return store.load(dataset)
+
+    if DATA_MODE == "snapshot" and store.latest(dataset) is not None:
+        if store.age(dataset) > CACHE_TTL:
+            _refresh_in_background(dataset)
+        return store.load(dataset)
+
+    try:
+        df = read_sheet(dataset)
+    except Exception:
+        # Keep serving the last good copy if the sheet is unavailable
+        if store.latest(dataset) is None:
+            raise
+        logger.exception("Reading '%s' failed, serving the latest snapshot", dataset)
+        return store.load(dataset)
+
+    try:
+        store.save(dataset, df)
+    except OSError:
+        logger.exception("Could not save a snapshot of '%s'", dataset)
+    return df
+
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def load_dataset(dataset):
+    """
+    Return the cached, typed DataFrame for a dataset, fetching it on a miss.
+
+    Every fetch is tagged with a new ``df.attrs["data_version"]``, so copies
+    served from the cache can be recognized without hashing their content.
+    """
+    df = schema.ingest(dataset, fetch_dataset(dataset))
+    df.attrs["data_version"] = f"{dataset}:{uuid.uuid4().hex}"
+    return df
+
+
+def data_version(df):
+    """
+    The fetch a cached dataset came from (None for other frames).
+    """
+    return df.attrs.get("data_version")
+
+
+def load_dashboard():
+    return load_dataset("dashboard")
+
+
+def load_ip():
+    return load_dataset("ip")
+
+
+def load_funding():
+    return load_dataset("funding")
+
+
+def load_admin():
+    return load_dataset("admin")
+
+
+def load_berkeley():
+    return load_dataset("berkeley")
+
+
+def load_ebi2():
+    return load_dataset("ebi2")
+
+
+def clear_cache():
+    """
+    Drop every cached dataset so the next access re-reads the sheets.
+    """
+    load_dataset.clear()
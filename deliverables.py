@@ -0,0 +1,62 @@
+"""
+Deliverable counts parsed from the dashboard's free text.
+
+Each project's `Productivity and Deliverables` entry is parsed once per data
+refresh into one row of counts per deliverable category. An entry that
+mentions a category counts the numbers written in front of it ("5 papers and
+2 articles" is 7 publications), or 1 when no number is given.
+Program- and PI-level counts are then grouped sums of that table.
+"""
+import re
+
+import pandas as pd
+
+TEXT_COLUMN = "Productivity and Deliverables"
+
+# Category -> (keywords that mention it, nouns that can follow a count)
+CATEGORIES = {
+    "Publications": (r"publication|paper|journal|article", r"publication|paper|article"),
+    "Presentations": (r"presentation|conference|workshop", r"presentation|conference|workshop"),
+    "Reports": (r"report", r"report"),
+    "Datasets": (r"dataset|data set", r"dataset|data set"),
+    "Software": (r"software|tool", r"software|tool"),
+    "Patents": (r"patent", r"patent"),
+}
+
+# Patterns compiled once at import
+_MENTIONS = {category: re.compile(mentions) for category, (mentions, _) in CATEGORIES.items()}
+_COUNTS = {category: re.compile(rf"(\d+)\s*(?:{nouns})") for category, (_, nouns) in CATEGORIES.items()}
+
+
+def extract(text):
+    """
+    Count deliverables per category in a Series of free-text entries.
+
+    Returns a DataFrame with the same index and one integer column per category.
+    """
+    lower = text.astype("string").str.lower()
+    counts = {}
+    for category in CATEGORIES:
+        mentioned = lower.str.contains(_MENTIONS[category], na=False)
+        numbers = lower.str.extractall(_COUNTS[category])[0].astype(int)
+        stated = numbers.groupby(level=0).sum().reindex(text.index)
+        counts[category] = stated.fillna(1).where(mentioned, 0).astype(int)
+    return pd.DataFrame(counts, index=text.index, columns=list(CATEGORIES))
+
+
+def project_deliverables(projects_df):
+    """
+    One row per project with its program, PI and deliverable counts.
+    """
+    id_columns = ["Project Name", "Program", "Principle Investigator"]
+    return pd.concat([projects_df[id_columns], extract(projects_df[TEXT_COLUMN])], axis=1)
+
+
+def totals(deliverables_df, by=None):
+    """
+    Deliverable counts summed over all projects (a Series), or per group of
+    `by` (a DataFrame).
+    """
+    if by is None:
+        return deliverables_df[list(CATEGORIES)].sum()
+    return deliverables_df.groupby(by, observed=True)[list(CATEGORIES)].sum()
@@ -1,23 +1,193 @@
+"""
+Keep the row with the most extensive productivity text for each project.
+
+In memory, use filter_by_max_productivity. For exports too big to load, stream
+them in chunks from the command line:
+
+    python filter.py "Productivity Data.csv" filtered_projects.csv
+    python filter.py export.parquet filtered.parquet --chunksize 200000 --presorted
+
+Between chunks only the longest row seen so far per project is held, so
+memory grows with the number of distinct projects (the size of the output),
+not with the export. With --presorted (input grouped by project), finished
+projects are written out as soon as the next project starts, so memory stays
+at about one chunk whatever the number of projects.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
 import pandas as pd
 
-def filter_by_max_productivity(df, project_col='Project Name', productivity_col='Productivity and Deliverables'):
+PROJECT_COL = 'Project Name'
+PRODUCTIVITY_COL = 'Productivity and Deliverables'
+
+# Rows read per chunk when streaming
+CHUNK_SIZE = 100_000
+
+
+def _text_lengths(series):
+    # Chunks without any text are read as floats, hence astype(str) after fillna
+    return series.fillna('').astype(str).str.len().to_numpy()
+
+
+def _longest_per_project(df, project_col, productivity_col):
+    """
+    Positions of each project's row with the longest productivity text (the
+    first one on ties), in project order.
+    """
+    lengths = pd.Series(_text_lengths(df[productivity_col]))
+    return lengths.groupby(df[project_col].to_numpy(), sort=True, dropna=False).idxmax().to_numpy()
+
+
+def filter_by_max_productivity(df, project_col=PROJECT_COL, productivity_col=PRODUCTIVITY_COL):
     """
     Filters the DataFrame to keep only the row with the most extensive productivity text for each project.
+
+    Rows come out in project order with their original index. One pass over
+    the rows, no full sort, and the input isn't modified.
+    """
+    return df.iloc[_longest_per_project(df, project_col, productivity_col)]
+
+
+def read_chunks(path, chunksize=CHUNK_SIZE):
+    """
+    DataFrames of up to chunksize rows from a CSV or Parquet file. CSV values
+    are kept as text, so they are written back unchanged.
+    """
+    if Path(path).suffix.lower() == '.parquet':
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunksize, dtype=str)
+
+
+def source_schema(path):
+    """
+    Arrow schema for writing rows of the file as Parquet: the Parquet file's
+    own schema, or text columns for a CSV file (read as text).
     """
-    # Compute text length of productivity
-    df['prod_len'] = df[productivity_col].fillna('').str.len()
-    # Sort by project and text length descending
-    sorted_df = df.sort_values(by=[project_col, 'prod_len'], ascending=[True, False])
-    # Drop duplicates, keeping the first (longest productivity)
-    filtered_df = sorted_df.drop_duplicates(subset=project_col, keep='first')
-    # Remove helper column
-    filtered_df = filtered_df.drop(columns=['prod_len'])
-    return filtered_df
+    import pyarrow as pa
+
+    if Path(path).suffix.lower() == '.parquet':
+        import pyarrow.parquet as pq
+
+        schema = pq.ParquetFile(path).schema_arrow
+        index_columns = (schema.pandas_metadata or {}).get('index_columns', [])
+        return pa.schema([field for field in schema if field.name not in index_columns])
+    return pa.schema([(col, pa.string()) for col in pd.read_csv(path, nrows=0).columns])
+
+
+class ChunkWriter:
+    """
+    Appends DataFrames to a CSV or Parquet file. Parquet output uses a fixed
+    schema, so a chunk where a column happens to be all null still matches.
+    """
+
+    def __init__(self, path, schema=None):
+        self.path = Path(path)
+        self.parquet = self.path.suffix.lower() == '.parquet'
+        self.schema = schema
+        self._writer = None
+        self._started = False
+
+    def write(self, df):
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(df, schema=self.schema, preserve_index=False)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.path, table.schema)
+            self._writer.write_table(table)
+        else:
+            df.to_csv(self.path, mode='a' if self._started else 'w', header=not self._started, index=False)
+        self._started = True
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def _project_key(project):
+    # NaN != NaN, so missing project names share one key
+    return None if pd.isna(project) else project
+
+
+def stream_max_productivity(source, output, chunksize=CHUNK_SIZE, presorted=False,
+                            project_col=PROJECT_COL, productivity_col=PRODUCTIVITY_COL, log=sys.stderr):
+    """
+    filter_by_max_productivity over a CSV/Parquet file, read and written in
+    chunks. Progress (rows/s) goes to `log` after every chunk. Returns the
+    rows read, rows written and seconds taken.
+    """
+    started = time.perf_counter()
+    writer = ChunkWriter(output, source_schema(source))
+    columns = None
+    # project -> (text length, row values) of its longest row so far
+    longest = {}
+    rows_in = rows_out = 0
+
+    def write(projects):
+        writer.write(pd.DataFrame.from_records([longest.pop(project)[1] for project in projects],
+                                               columns=columns))
+
+    try:
+        for chunk in read_chunks(source, chunksize):
+            columns = list(chunk.columns)
+            rows_in += len(chunk)
+            if not len(chunk):
+                continue
+            # Each project's longest row in the chunk, then against the one held
+            winners = chunk.iloc[_longest_per_project(chunk, project_col, productivity_col)]
+            rows = winners.itertuples(index=False, name=None)
+            for project, length, row in zip(winners[project_col], _text_lengths(winners[productivity_col]), rows):
+                project = _project_key(project)
+                held = longest.get(project)
+                # Earlier rows win ties
+                if held is None or length > held[0]:
+                    longest[project] = (length, row)
+
+            if presorted:
+                # Every project but the chunk's last one is finished
+                last = _project_key(chunk[project_col].iloc[-1])
+                finished = [project for project in longest if project != last]
+                if finished:
+                    write(finished)
+                    rows_out += len(finished)
+
+            if log:
+                elapsed = time.perf_counter() - started
+                print(f"{rows_in:,} rows read, {rows_in / elapsed:,.0f} rows/s, "
+                      f"{len(longest):,} projects held", file=log)
+
+        # Remaining projects in project order, missing names last
+        projects = sorted(longest, key=lambda project: (project is None, project))
+        rows_out += len(projects)
+        for start in range(0, len(projects), chunksize):
+            write(projects[start:start + chunksize])
+    finally:
+        writer.close()
+    return rows_in, rows_out, time.perf_counter() - started
+
 
 if __name__ == "__main__":
-    # Example: load your data into df, e.g., from CSV
-    df = pd.read_csv('/Users/iyangodwin/EBI-StreamlitApp/EBI Dashboard Data - Productivity Data.csv')
-    filtered_df = filter_by_max_productivity(df)
-    # Save or display the filtered result
-    filtered_df.to_csv('filtered_projects.csv', index=False)
-    print(filtered_df)
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('source', help="CSV or Parquet export")
+    parser.add_argument('output', nargs='?', default='filtered_projects.csv',
+                        help="CSV or Parquet file to write (default: filtered_projects.csv)")
+    parser.add_argument('--chunksize', type=int, default=CHUNK_SIZE, help="rows read per chunk")
+    parser.add_argument('--presorted', action='store_true',
+                        help="input is grouped by project; write projects out as they finish")
+    parser.add_argument('--project-col', default=PROJECT_COL)
+    parser.add_argument('--productivity-col', default=PRODUCTIVITY_COL)
+    args = parser.parse_args()
+
+    rows_in, rows_out, seconds = stream_max_productivity(
+        args.source, args.output, args.chunksize, args.presorted, args.project_col, args.productivity_col
+    )
+    print(f"{rows_in:,} rows -> {rows_out:,} projects in {seconds:.2f}s "
+          f"({rows_in / max(seconds, 1e-9):,.0f} rows/s), written to {args.output}")
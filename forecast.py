@@ -0,0 +1,114 @@
+"""
+Monte Carlo funding forecast for the Berkeley sheet.
+
+Each funding line item gets a simple model fitted to its actuals: a growth
+model (mean and spread of its year-over-year log growth) and a linear trend
+(slope and residual spread). Scenarios are then simulated for every path,
+line item and forecast year at once as NumPy arrays, and summarized as
+P10/P50/P90 bands. Simulating and summarizing 10,000 paths for every line
+item takes tens of milliseconds, and results are cached per set of
+assumptions, so the page can re-simulate as the assumptions change.
+"""
+import numpy as np
+import pandas as pd
+
+from berkeley import LAST_ACTUAL_YEAR
+
+# Years forecast after the last actual year
+HORIZON = 5
+
+# Spread of yearly growth assumed when a line item has too little history
+DEFAULT_VOLATILITY = 0.2
+
+# Cap on the fitted spread, so one erratic line item doesn't swamp the total
+MAX_VOLATILITY = 1.0
+
+PERCENTILES = {"P10": 10, "P50": 50, "P90": 90}
+
+MODELS = ["growth", "trend"]
+
+
+class ForecastModel:
+    """
+    Per line item baselines and growth and trend parameters, fitted to
+    line items x years as from BerkeleyIndex.frame.
+    """
+
+    def __init__(self, yearly, last_actual_year=LAST_ACTUAL_YEAR, horizon=HORIZON):
+        years = sorted(year for year in yearly.columns if year <= last_actual_year)
+        history = yearly[years].to_numpy(dtype=float)
+        # (Legend, Source) per line item; a Source name can appear under several Legends
+        self.keys = list(yearly.index)
+        self.sources = yearly.index.get_level_values('Source').tolist()
+        self.years = np.arange(last_actual_year + 1, last_actual_year + 1 + horizon)
+
+        # Line items without funding in the last actual year are treated as ended
+        self.base = history[:, -1] if years else np.zeros(len(self.sources))
+        self.growth = np.zeros(len(self.sources))
+        self.volatility = np.full(len(self.sources), DEFAULT_VOLATILITY)
+        self.slope = np.zeros(len(self.sources))
+        self.residual = self.base * DEFAULT_VOLATILITY
+
+        t = np.arange(len(years))
+        for i, row in enumerate(history):
+            positive = row > 0
+            # Log growth between consecutive funded years
+            pairs = positive[1:] & positive[:-1]
+            rates = np.diff(np.log(np.where(positive, row, 1)))[pairs]
+            if len(rates):
+                self.growth[i] = rates.mean()
+            if len(rates) > 1:
+                self.volatility[i] = min(rates.std(ddof=1), MAX_VOLATILITY)
+            # Linear trend over the funded years
+            if positive.sum() > 2:
+                slope, intercept = np.polyfit(t[positive], row[positive], 1)
+                self.slope[i] = slope
+                self.residual[i] = (row[positive] - (slope * t[positive] + intercept)).std(ddof=2)
+
+
+def simulate(model, paths=10_000, kind="growth", growth=0.0, volatility=1.0, renewal=1.0, seed=0):
+    """
+    Simulated funding, shaped (paths, line items, years).
+
+    `growth` is added to every line item's yearly growth rate (0.05 = +5
+    points), `volatility` scales the fitted spreads, and `renewal` is the
+    chance a line item is still funded each year (once it lapses it stays
+    at zero).
+    """
+    rng = np.random.default_rng(seed)
+    shape = (paths, len(model.sources), len(model.years))
+    steps = np.arange(1, len(model.years) + 1)
+
+    if kind == "growth":
+        rates = rng.normal(model.growth[:, None] + growth, model.volatility[:, None] * volatility, shape)
+        values = model.base[:, None] * np.exp(np.cumsum(rates, axis=2))
+    elif kind == "trend":
+        trend = model.base[:, None] + model.slope[:, None] * steps
+        noise = rng.normal(0, 1, shape) * (model.residual[:, None] * volatility)
+        values = np.maximum(trend * (1 + growth) ** steps + noise, 0)
+    else:
+        raise ValueError(f"Unknown forecast model '{kind}', expected one of {MODELS}")
+
+    if renewal < 1:
+        values *= np.cumprod(rng.random(shape) < renewal, axis=2)
+    return values
+
+
+def bands(model, values):
+    """
+    P10/P50/P90 of simulated funding, per line item and year and for the
+    total over line items (one row per Legend, Source and Year; Legend and
+    Source 'Total' for the total).
+    """
+    sims = np.concatenate([values.sum(axis=1, keepdims=True), values], axis=1)
+    # (percentile, line item, year), in one pass over the paths
+    quantiles = np.percentile(sims, list(PERCENTILES.values()), axis=0)
+    keys = [("Total", "Total")] + model.keys
+    frame = pd.DataFrame({
+        "Legend": np.repeat([legend for legend, _ in keys], len(model.years)),
+        "Source": np.repeat([source for _, source in keys], len(model.years)),
+        "Year": np.tile(model.years, len(keys)),
+    })
+    for i, name in enumerate(PERCENTILES):
+        frame[name] = quantiles[i].ravel()
+    return frame
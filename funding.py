@@ -0,0 +1,233 @@
+"""
+Funding analytics over the finance sheet.
+
+The finance sheet has one row per PI and funding type with a `{year} Actual`
+and `{year} Budget` column per year. It is reshaped once into a long table
+(one row per finance row, year and kind) and joined to the projects it funds
+through a small link table, so every breakdown on the Research page is a
+single grouped aggregation.
+
+Each finance row is counted once per group it belongs to: a PI with three
+projects in the same program adds their funding to that program once.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+# First year of the funding sheet
+FIRST_YEAR = 2008
+
+# Sponsor eras, inclusive year ranges
+ERAS = {
+    "BP": (2008, 2015),
+    "Shell": (2016, 2024),
+}
+
+# Columns that come from the projects sheet rather than the finance sheet
+PROJECT_COLUMNS = ["Program", "Discipline", "Institution", "Sponsor"]
+
+_YEAR_COLUMN = re.compile(r"(\d{4}) (Actual|Budget)")
+
+
+def year_columns(df):
+    """
+    Map each `{year} Actual` / `{year} Budget` column of df to (year, kind).
+    """
+    columns = {}
+    for col in df.columns:
+        match = _YEAR_COLUMN.fullmatch(str(col).strip())
+        if match:
+            columns[col] = (int(match.group(1)), match.group(2))
+    return columns
+
+
+def to_long(finance_df):
+    """
+    Reshape the finance sheet to one row per finance row, year and kind.
+
+    Columns: row (the finance row's index), PI, Type, Year, Kind, Amount.
+    """
+    columns = year_columns(finance_df)
+    wide = finance_df[['PI', 'Type'] + list(columns)].rename_axis('row').reset_index()
+    long = wide.melt(id_vars=['row', 'PI', 'Type'], value_vars=list(columns),
+                     var_name='Column', value_name='Amount')
+    long['Year'] = long['Column'].map({col: year for col, (year, _) in columns.items()})
+    long['Kind'] = long['Column'].map({col: kind for col, (_, kind) in columns.items()})
+    long['Amount'] = long['Amount'].astype(float).fillna(0)
+    return long.drop(columns='Column')
+
+
+def link_projects(finance_df, crosswalk):
+    """
+    Link finance rows to the projects of the person they fund.
+
+    Funding rows name the PI by last name only; the PI crosswalk maps each to
+    one person on the projects sheet. Rows whose PI is unknown or ambiguous are
+    left unlinked. Returns one row per distinct (finance row, Program,
+    Discipline, Institution, Sponsor).
+    """
+    people = {pi: crosswalk.person_of(pi) for pi in finance_df['PI'].dropna().unique()}
+    finance_pis = finance_df[['PI']].rename_axis('row').reset_index()
+    finance_pis['Person'] = finance_pis['PI'].astype(object).map(people)
+    links = pd.merge(
+        finance_pis.dropna(subset=['Person']),
+        crosswalk.projects[['Person'] + PROJECT_COLUMNS],
+        on='Person',
+        how='inner'
+    )
+    return links[['row', 'PI', 'Person'] + PROJECT_COLUMNS].drop_duplicates(ignore_index=True)
+
+
+def era_of(years):
+    """
+    Name the sponsor era of each year (NaN outside every era).
+    """
+    years = np.asarray(years)
+    labels = np.full(years.shape, np.nan, dtype=object)
+    for era, (start, end) in ERAS.items():
+        labels[(years >= start) & (years <= end)] = era
+    return labels
+
+
+class YearRangeIndex:
+    """
+    Prefix sums of yearly amounts per entity, for O(1) year-range totals.
+
+    Built from a table of entities x years; the total of any inclusive
+    [start, end] range is the difference of two prefix-sum columns.
+    """
+
+    def __init__(self, yearly):
+        if len(yearly.columns):
+            first, last = int(min(yearly.columns)), int(max(yearly.columns))
+        else:
+            first, last = FIRST_YEAR, FIRST_YEAR - 1
+        self.years = np.arange(first, last + 1)
+        self.entities = yearly.index
+        values = yearly.reindex(columns=self.years, fill_value=0).to_numpy(dtype=float)
+        # Column j holds the sum of the first j years, so column 0 is all zeros
+        self.prefix = np.zeros((len(self.entities), len(self.years) + 1))
+        np.cumsum(values, axis=1, out=self.prefix[:, 1:])
+
+    def total(self, start=None, end=None):
+        """
+        Total per entity over the inclusive year range [start, end].
+
+        A missing bound means the first (or last) year of the index.
+        """
+        first = self.years[0] if len(self.years) else FIRST_YEAR
+        lo = 0 if start is None else int(np.clip(start - first, 0, len(self.years)))
+        hi = len(self.years) if end is None else int(np.clip(end - first + 1, 0, len(self.years)))
+        totals = self.prefix[:, hi] - self.prefix[:, lo] if hi > lo else np.zeros(len(self.entities))
+        return pd.Series(totals, index=self.entities, name='Amount')
+
+
+class FundingAnalytics:
+    """
+    Grouped funding totals by PI, type, program, discipline, institution,
+    sponsor, year or era.
+    """
+
+    def __init__(self, finance_df, crosswalk):
+        self.long = to_long(finance_df)
+        self.long['Era'] = era_of(self.long['Year'])
+        self.links = link_projects(finance_df, crosswalk)
+        # First discipline of each PI within a program
+        self.disciplines = (self.links.drop_duplicates(['Program', 'PI'])
+                            .set_index(['Program', 'PI'])['Discipline'])
+        # (grouping, kind) -> YearRangeIndex, built on first use
+        self._range_indexes = {}
+
+    def frame(self, by, years=None, kind="Actual"):
+        """
+        Long rows of one kind within years (an inclusive (start, end) pair),
+        with the project columns in `by` attached.
+        """
+        by = [by] if isinstance(by, str) else list(by)
+        long = self.long[self.long['Kind'] == kind]
+        if years is not None:
+            start, end = years
+            long = long[long['Year'].between(start, end)]
+        project_by = [col for col in by if col in PROJECT_COLUMNS]
+        if project_by:
+            links = self.links[['row'] + project_by].drop_duplicates()
+            long = long.merge(links, on='row', how='inner')
+        return long
+
+    def range_index(self, by, kind="Actual"):
+        """
+        The YearRangeIndex of funding per group, built once per grouping.
+        """
+        by = [by] if isinstance(by, str) else list(by)
+        key = (tuple(by), kind)
+        if key not in self._range_indexes:
+            frame = self.frame(by, kind=kind)
+            yearly = frame.groupby(by + ['Year'], observed=True)['Amount'].sum()
+            self._range_indexes[key] = YearRangeIndex(yearly.unstack('Year', fill_value=0))
+        return self._range_indexes[key]
+
+    def totals(self, by, years=None, kind="Actual"):
+        """
+        Total funding per group, as a Series indexed by `by`.
+
+        Year ranges are answered from the group's prefix-sum index.
+        """
+        by = [by] if isinstance(by, str) else list(by)
+        if 'Year' in by or 'Era' in by:
+            frame = self.frame(by, years, kind)
+            return frame.groupby(by, observed=True)['Amount'].sum()
+        return self.range_index(by, kind).total(*(years or (None, None)))
+
+    def yearly(self, by, years=None, kind="Actual"):
+        """
+        Funding per group and year, as a DataFrame with `by`, Year and Funding.
+        """
+        by = [by] if isinstance(by, str) else list(by)
+        frame = self.frame(by, years, kind)
+        yearly = frame.groupby(by + ['Year'], observed=True)['Amount'].sum()
+        return yearly.rename('Funding').reset_index()
+
+    def era_totals(self, by, kind="Actual"):
+        """
+        Funding per group and sponsor era, with one column per era.
+        """
+        by = [by] if isinstance(by, str) else list(by)
+        frame = self.frame(by, kind=kind)
+        totals = frame.groupby(by + ['Era'], observed=True)['Amount'].sum()
+        return totals.unstack('Era', fill_value=0).reindex(columns=list(ERAS), fill_value=0)
+
+    def pi_counts(self, by):
+        """
+        Number of distinct funded PIs per project group.
+        """
+        return self.links.groupby(by, observed=True)['PI'].nunique()
+
+    def summary(self, by, years=None):
+        """
+        Total_Funding and Number_of_PIs per group, largest first.
+        """
+        summary = pd.DataFrame({
+            'Total_Funding': self.totals(by, years),
+            'Number_of_PIs': self.pi_counts(by),
+        }).fillna(0)
+        return summary.sort_values('Total_Funding', ascending=False).rename_axis(by).reset_index()
+
+    def programs(self):
+        """
+        Funded programs, in order of first appearance.
+        """
+        return [program for program in self.links['Program'].unique() if pd.notna(program)]
+
+    def program_pis(self, program, years=None):
+        """
+        Funding per PI and type within one program, largest first.
+
+        Columns: PI, Type, Total_Funding, Discipline.
+        """
+        totals = self.totals(['Program', 'PI', 'Type'], years)
+        if program not in totals.index.get_level_values('Program'):
+            return pd.DataFrame(columns=['PI', 'Type', 'Total_Funding', 'Discipline'])
+        pi_df = totals.xs(program, level='Program').rename('Total_Funding').reset_index()
+        pi_df['Discipline'] = pi_df['PI'].map(self.disciplines.xs(program, level='Program'))
+        return pi_df.sort_values('Total_Funding', ascending=False, kind='stable', ignore_index=True)
@@ -0,0 +1,286 @@
+"""
+PI name resolution.
+
+Different sheets (and different rows of the same sheet) spell the same person
+slightly differently: "Jay Keasling", "Jay D. Keasling", "Jay Kiesling". The
+resolver maps every spelling to one canonical name. Candidates are blocked by
+first initial and last-name token so each new name is only compared with the
+handful of known names that could plausibly match, instead of with every name
+seen so far. First and last names are scored separately, so sharing a common
+surname is never enough to be merged.
+
+Each sheet column has its own resolver, and a column is always resolved as a
+whole in a fixed order, so the result depends only on the names in it.
+Resolved aliases are cached on disk per set of names, and a curated override
+table (pi_overrides.csv) always wins over fuzzy matching.
+"""
+import csv
+import difflib
+import hashlib
+import json
+import os
+import re
+import threading
+import unicodedata
+from pathlib import Path
+
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent
+
+# Curated alias -> canonical name table, checked into the repo
+DEFAULT_OVERRIDES = ROOT / "pi_overrides.csv"
+
+# Directory of resolved alias caches, one file per resolver
+DEFAULT_CACHE_DIR = Path(os.environ.get("EBI_ALIAS_CACHE_DIR", ROOT / "pi_aliases"))
+
+# Alias maps kept per resolver, one per distinct set of names
+CACHE_ENTRIES = 4
+
+# Minimum similarity (0-1) for two spellings to be treated as the same person
+DEFAULT_CUTOFF = 0.8
+
+# Length of the last-name prefix/suffix used as extra blocking keys
+BLOCK_AFFIX = 4
+
+# Part of every cache signature; bump when the matching rules change so
+# alias maps cached by an older version are rebuilt
+MATCHING_VERSION = 2
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_name(name):
+    """
+    Lowercase, strip accents and punctuation, and collapse whitespace.
+    """
+    name = str(name)
+    if not name.isascii():
+        name = unicodedata.normalize("NFKD", name)
+        name = "".join(c for c in name if not unicodedata.combining(c))
+    name = _PUNCTUATION.sub(" ", name.lower())
+    return _SPACES.sub(" ", name).strip()
+
+
+def name_parts(normalized):
+    """
+    (first, last) name of a normalized name. Middle names are ignored, and a
+    single word is a last name with an empty first name.
+    """
+    tokens = normalized.split()
+    if not tokens:
+        return "", ""
+    if len(tokens) == 1:
+        return "", tokens[0]
+    return tokens[0], tokens[-1]
+
+
+def block_keys(normalized):
+    """
+    Blocking keys for a normalized name: its first initial with its last
+    token and with that token's prefix and suffix, so a last-name typo at
+    either end still shares a block.
+    """
+    first, last = name_parts(normalized)
+    if not last:
+        return set()
+    initial = first[:1]
+    return {f"last:{initial}:{last}", f"pre:{initial}:{last[:BLOCK_AFFIX]}",
+            f"suf:{initial}:{last[-BLOCK_AFFIX:]}"}
+
+
+def _part_similarity(matcher, part, floor):
+    if part == matcher.b:
+        return 1.0
+    # Cheap upper bounds first; most candidates stop here
+    matcher.set_seq1(part)
+    if matcher.real_quick_ratio() < floor or matcher.quick_ratio() < floor:
+        return 0.0
+    return matcher.ratio()
+
+
+def load_overrides(path=DEFAULT_OVERRIDES):
+    """
+    Read the curated override table (alias,canonical) into a dict.
+    """
+    path = Path(path)
+    if not path.is_file():
+        return {}
+    with path.open(newline="", encoding="utf-8") as f:
+        return {
+            row["alias"].strip(): row["canonical"].strip()
+            for row in csv.DictReader(f)
+            if row.get("alias") and row.get("canonical")
+        }
+
+
+def _resolve_order(normalized, name):
+    # More words first, then full first names before initials, then alphabetically
+    first, _ = name_parts(normalized)
+    return -len(normalized.split()), len(first) == 1, normalized, name
+
+
+class NameResolver:
+    """
+    Maps the name spellings of one column to canonical names, with a
+    confidence per mapping.
+
+    Names are resolved in a fixed order: names with more words first, then
+    full first names before initials, so full names rather than bare last
+    names or initials become the canonical names, then alphabetically. A
+    name joins the most similar canonical name in its blocks if both its
+    first and its last name are at least `cutoff` similar (an initial counts
+    as just `cutoff` similar to a first name it starts) and no other
+    canonical name is as similar; otherwise it becomes a canonical name
+    itself. The match confidence is the lower of the two scores.
+    """
+
+    def __init__(self, overrides=None, cache_path=None, cutoff=DEFAULT_CUTOFF):
+        self.overrides = load_overrides() if overrides is None else dict(overrides)
+        self.cache_path = Path(cache_path) if cache_path else None
+        self.cutoff = cutoff
+        # names signature -> {name: (canonical, confidence, method)}, most recent last
+        self._resolved = {}
+        # block key -> {normalized canonical: (canonical, first, last)}, while resolving
+        self._blocks = {}
+        self._lock = threading.Lock()
+
+    def _signature(self, names):
+        # An alias map is only valid for the same names, overrides and cutoff
+        payload = json.dumps([MATCHING_VERSION, sorted(self.overrides.items()), self.cutoff, names])
+        return hashlib.sha1(payload.encode()).hexdigest()
+
+    def _load_cache(self):
+        if self.cache_path is None or not self.cache_path.is_file():
+            return {}
+        try:
+            return json.loads(self.cache_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    def save(self):
+        """
+        Write the recent alias maps to the cache file (if there is one).
+        """
+        if self.cache_path is None:
+            return
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.cache_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(self._resolved, indent=1), encoding="utf-8")
+        os.replace(tmp_path, self.cache_path)
+
+    def _add_canonical(self, canonical, normalized=None):
+        normalized = normalized or normalize_name(canonical)
+        entry = (canonical, *name_parts(normalized))
+        for key in block_keys(normalized):
+            self._blocks.setdefault(key, {})[normalized] = entry
+
+    def _match(self, name, normalized):
+        if name in self.overrides:
+            return self.overrides[name], 1.0, "override"
+
+        candidates = {}
+        for key in block_keys(normalized):
+            candidates.update(self._blocks.get(key, {}))
+        if not candidates:
+            return name, 1.0, "new"
+        if normalized in candidates:
+            return candidates[normalized][0], 1.0, "exact"
+
+        first, last = name_parts(normalized)
+        first_matcher = difflib.SequenceMatcher(b=first)
+        last_matcher = difflib.SequenceMatcher(b=last)
+        best, best_score, ambiguous = None, self.cutoff, False
+        for canonical, candidate_first, candidate_last in candidates.values():
+            score = _part_similarity(last_matcher, candidate_last, best_score)
+            if score < best_score:
+                continue
+            if first != candidate_first and min(len(first), len(candidate_first)) == 1:
+                # An initial; the shared block means it is the first name's
+                first_score = self.cutoff
+            else:
+                first_score = _part_similarity(first_matcher, candidate_first, best_score)
+            score = min(score, first_score)
+            if score < best_score:
+                continue
+            # Equally close to two people (say "J. Smith" to Jane and John Smith)
+            ambiguous = best is not None and score == best_score
+            best, best_score = canonical, score
+        if best is not None and not ambiguous:
+            return best, round(best_score, 3), "fuzzy"
+        return name, 1.0, "new"
+
+    def _resolve_all(self, names):
+        """
+        Alias map for a sorted list of names, built from scratch.
+        """
+        aliases = {}
+        self._blocks = {}
+        for name in names:
+            if name in aliases:
+                # Already added as an override target
+                continue
+            normalized = normalize_name(name)
+            canonical, confidence, method = self._match(name, normalized)
+            aliases[name] = (canonical, confidence, method)
+            if method == "new":
+                self._add_canonical(canonical, normalized)
+            elif method == "override" and canonical not in aliases:
+                aliases[canonical] = (canonical, 1.0, "new")
+                self._add_canonical(canonical)
+        self._blocks = {}
+        return aliases
+
+    def resolve(self, names):
+        """
+        Resolve names, returning a DataFrame indexed by name with the
+        canonical name, match confidence and method (override, exact,
+        fuzzy or new).
+        """
+        unique = pd.unique(pd.Series(names).dropna())
+        ordered = sorted(
+            (str(name) for name in unique),
+            key=lambda name: _resolve_order(normalize_name(name), name),
+        )
+        signature = self._signature(ordered)
+        with self._lock:
+            aliases = self._resolved.pop(signature, None)
+            if aliases is None:
+                aliases = self._load_cache().get(signature)
+            new = aliases is None
+            if new:
+                aliases = self._resolve_all(ordered)
+            # Most recently used last
+            self._resolved[signature] = aliases
+            self._resolved = dict(list(self._resolved.items())[-CACHE_ENTRIES:])
+            if new:
+                try:
+                    self.save()
+                except OSError:
+                    pass
+        rows = {name: tuple(aliases[str(name)]) for name in unique}
+        return pd.DataFrame.from_dict(
+            rows, orient="index", columns=["canonical", "confidence", "method"]
+        ).rename_axis("name")
+
+    def alias_map(self, names):
+        """
+        Dict of each name to its canonical name.
+        """
+        return self.resolve(names)["canonical"].to_dict()
+
+    def canonicalize(self, series):
+        """
+        Replace every name in a Series (object or categorical) by its canonical name.
+        """
+        mapping = self.alias_map(series.dropna().unique())
+        resolved = series.astype(object).map(mapping)
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            return resolved.astype("category")
+        return resolved
+
+
+# One resolver per name column, so one sheet's names never change another's
+dashboard_resolver = NameResolver(cache_path=DEFAULT_CACHE_DIR / "dashboard.json")
+ip_resolver = NameResolver(cache_path=DEFAULT_CACHE_DIR / "ip.json")
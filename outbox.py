@@ -0,0 +1,288 @@
+"""
+Durable outbox for notification emails.
+
+Pages enqueue messages and return straight away. The messages are committed to
+a local SQLite file, so a restart loses nothing. A background worker sends them
+in batches through a pluggable transport, retrying failures with exponential
+backoff. Any transport can be used: SendGrid in production, SMTP, or a local
+file sink for development and tests.
+
+Usage:
+    box = outbox.start()
+    box.enqueue(to, subject, body)
+    box.stats()  # queue depth and send latency
+"""
+import json
+import logging
+import os
+import smtplib
+import sqlite3
+import threading
+import time
+from email.message import EmailMessage
+from pathlib import Path
+
+import streamlit as st
+
+logger = logging.getLogger(__name__)
+
+ROOT = Path(__file__).resolve().parent
+
+# Local queue, kept across restarts
+DEFAULT_DB = Path(os.environ.get("EBI_OUTBOX_DB", ROOT / "outbox.db"))
+
+# Messages sent per worker cycle
+BATCH_SIZE = 20
+
+# A message is given up on after this many failed attempts
+MAX_ATTEMPTS = 6
+
+# First retry delay in seconds, doubled after every failed attempt
+RETRY_DELAY = 30
+
+# Longest the worker sleeps before checking for due retries
+POLL_INTERVAL = 15
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    sender TEXT NOT NULL,
+    recipient TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    body TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL,
+    last_error TEXT,
+    created REAL NOT NULL,
+    sent REAL
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt);
+"""
+
+
+class FileTransport:
+    """
+    Appends each message as a JSON line to a file instead of sending it.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+
+    def send(self, messages):
+        with self.path.open("a", encoding="utf-8") as f:
+            for message in messages:
+                f.write(json.dumps(message) + "\n")
+        return {message["id"]: None for message in messages}
+
+
+class SMTPTransport:
+    """
+    Sends messages over one SMTP connection per batch.
+    """
+
+    def __init__(self, host, port=587, username=None, password=None, starttls=True):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+
+    def send(self, messages):
+        results = {}
+        with smtplib.SMTP(self.host, self.port, timeout=30) as smtp:
+            if self.starttls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password)
+            for message in messages:
+                email = EmailMessage()
+                email["From"] = message["sender"]
+                email["To"] = message["recipient"]
+                email["Subject"] = message["subject"]
+                email.set_content(message["body"])
+                try:
+                    smtp.send_message(email)
+                    results[message["id"]] = None
+                except smtplib.SMTPException as e:
+                    results[message["id"]] = str(e)
+        return results
+
+
+class SendGridTransport:
+    """
+    Sends messages through the SendGrid API.
+    """
+
+    def __init__(self, api_key):
+        from sendgrid import SendGridAPIClient
+
+        self.client = SendGridAPIClient(api_key)
+
+    def send(self, messages):
+        from sendgrid.helpers.mail import Mail
+
+        results = {}
+        for message in messages:
+            mail = Mail(
+                from_email=message["sender"],
+                to_emails=message["recipient"],
+                subject=message["subject"],
+                plain_text_content=message["body"],
+            )
+            try:
+                self.client.send(mail)
+                results[message["id"]] = None
+            except Exception as e:
+                results[message["id"]] = str(e)
+        return results
+
+
+class Outbox:
+    """
+    SQLite-backed message queue with a background sender.
+    """
+
+    def __init__(self, transport, db_path=DEFAULT_DB, batch_size=BATCH_SIZE,
+                 max_attempts=MAX_ATTEMPTS, retry_delay=RETRY_DELAY):
+        self.transport = transport
+        self.db_path = Path(db_path)
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        # Seconds each of the recent batches took to send
+        self.send_times = []
+        self._wake = threading.Event()
+        self._thread = None
+        with self._connect() as db:
+            db.executescript(_SCHEMA)
+
+    def _connect(self):
+        db = sqlite3.connect(self.db_path, timeout=30)
+        db.row_factory = sqlite3.Row
+        return db
+
+    def enqueue(self, recipient, subject, body, sender=None):
+        """
+        Durably queue a message and wake the sender; returns the message id.
+        """
+        now = time.time()
+        with self._connect() as db:
+            cursor = db.execute(
+                "INSERT INTO outbox (sender, recipient, subject, body, next_attempt, created)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (sender or recipient, recipient, subject, body, now, now),
+            )
+        self._wake.set()
+        return cursor.lastrowid
+
+    def _due(self):
+        with self._connect() as db:
+            rows = db.execute(
+                "SELECT id, sender, recipient, subject, body, attempts FROM outbox"
+                " WHERE status = 'pending' AND next_attempt <= ? ORDER BY id LIMIT ?",
+                (time.time(), self.batch_size),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def flush(self):
+        """
+        Send every message that is due now; returns the number sent.
+        """
+        sent = 0
+        while True:
+            batch = self._due()
+            if not batch:
+                return sent
+            started = time.perf_counter()
+            try:
+                results = self.transport.send(batch)
+            except Exception as e:
+                # The whole batch failed, e.g. the mail server is down
+                results = {message["id"]: str(e) for message in batch}
+            self.send_times = (self.send_times + [time.perf_counter() - started])[-50:]
+
+            now = time.time()
+            with self._connect() as db:
+                for message in batch:
+                    error = results.get(message["id"], "no result from transport")
+                    if error is None:
+                        db.execute("UPDATE outbox SET status = 'sent', sent = ?, attempts = attempts + 1,"
+                                   " last_error = NULL WHERE id = ?", (now, message["id"]))
+                        sent += 1
+                        continue
+                    attempts = message["attempts"] + 1
+                    status = "failed" if attempts >= self.max_attempts else "pending"
+                    db.execute(
+                        "UPDATE outbox SET status = ?, attempts = ?, next_attempt = ?, last_error = ?"
+                        " WHERE id = ?",
+                        (status, attempts, now + self.retry_delay * 2 ** (attempts - 1), error, message["id"]),
+                    )
+                    logger.warning("Sending message %s failed (attempt %s): %s", message["id"], attempts, error)
+
+    def _run(self):
+        while True:
+            # Cleared before draining, so a message enqueued from here on wakes the next wait
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Outbox worker cycle failed")
+            self._wake.wait(POLL_INTERVAL)
+
+    def start(self):
+        """
+        Start the background sender (once).
+        """
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="outbox", daemon=True)
+            self._thread.start()
+        return self
+
+    def stats(self):
+        """
+        Queue depth per status and send latency, in seconds.
+        """
+        with self._connect() as db:
+            counts = dict(db.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall())
+            delivery = db.execute(
+                "SELECT AVG(sent - created) FROM"
+                " (SELECT sent, created FROM outbox WHERE status = 'sent' ORDER BY id DESC LIMIT 50)"
+            ).fetchone()[0]
+        return {
+            "pending": counts.get("pending", 0),
+            "sent": counts.get("sent", 0),
+            "failed": counts.get("failed", 0),
+            # Time from enqueue to sent, averaged over the last 50 messages
+            "delivery_latency": delivery,
+            # Time the transport took per batch, averaged over the last 50 batches
+            "send_latency": sum(self.send_times) / len(self.send_times) if self.send_times else None,
+        }
+
+
+def transport_from_config():
+    """
+    Pick the mail transport from EBI_MAIL_TRANSPORT (sendgrid, smtp or file).
+
+    Defaults to SendGrid when a key is in st.secrets, and to a local file
+    sink (sent_mail.jsonl) otherwise.
+    """
+    try:
+        has_sendgrid = "sendgrid" in st.secrets
+    except FileNotFoundError:
+        # No secrets file at all
+        has_sendgrid = False
+    kind = os.environ.get("EBI_MAIL_TRANSPORT") or ("sendgrid" if has_sendgrid else "file")
+    if kind == "sendgrid":
+        return SendGridTransport(st.secrets["sendgrid"]["api_key"])
+    if kind == "smtp":
+        return SMTPTransport(**st.secrets["smtp"])
+    return FileTransport(os.environ.get("EBI_MAIL_FILE", ROOT / "sent_mail.jsonl"))
+
+
+@st.cache_resource(show_spinner=False)
+def start():
+    """
+    The process-wide outbox, with its sender running.
+    """
+    return Outbox(transport_from_config()).start()
@@ -1,6 +1,9 @@
 import streamlit as st
-from streamlit_gsheets import GSheetsConnection
-import pandas as pd
+import berkeley
+import data
+import forecast
+import tables
+import warmup
 import plotly.express as px
 from plotly import graph_objects as go
 
@@ -8,15 +11,12 @@ from plotly import graph_objects as go
 st.set_page_config(page_title="Berkeley Centric", page_icon="🏛️", layout="wide")
 st.title("🏛️ Berkeley Financial Overview")
 
-@st.cache_data(ttl=600)
-def load_data():
-    conn_dashboard = st.connection("gsheets_dashboard", type=GSheetsConnection)
-    conn_funding = st.connection("gsheets_funding", type=GSheetsConnection)
-    return conn_dashboard.read(), conn_funding.read()
-
+# Warm every sheet in the background (once per cache period), in case this page
+# was opened directly rather than from the home page
+warmup.show_status(warmup.start())
 
 # Load dashboard data and filter for Berkeley projects
-dashboard_df, _ = load_data()
+dashboard_df = data.load_dashboard()
 berkeley_projects_df = dashboard_df[dashboard_df['Institution'] == 'UC Berkeley']
 
 # Calculate top-level Berkeley metrics
@@ -45,7 +45,7 @@ col1, col2 = st.columns(2)
 with col1:
     # Always start from 2017 now that we have the data
     min_year = 2008
-    max_year = 2024
+    max_year = berkeley.LAST_ACTUAL_YEAR
     time_series_year_range = st.slider(
         "Select Year Range",
         min_value=min_year,
@@ -57,80 +57,13 @@ with col1:
     )
     st.markdown("<h3 style='font-size:16px;'>2008-2015 BP / 2017 + Shell</h3>", unsafe_allow_html=True)
 
-# Update year ranges based on toggle and slider
-historical_years = [str(year) for year in range(time_series_year_range[0], time_series_year_range[1] + 1)]
-
-# Create connection to Google Sheets
-conn = st.connection("gsheets_berkeley", type=GSheetsConnection)
-df = conn.read()
-
-
-# Clean up the data - convert to numeric and handle NaN
-numeric_columns = df.columns[2:]  # Skip the first two columns (Legend and Source)
-for col in numeric_columns:
-    df[col] = pd.to_numeric(df[col].astype(str).str.replace(',', ''), errors='coerce')
-
-# Update name mapping
-name_mapping = {
-    'Research (Berkeley only)': 'Berkeley Research Funds',
-    'reports': ' Research Subawards',
-    'Administration fee': 'EBI-Shell Administration fee'
-}
-df['Source'] = df['Source'].replace(name_mapping)
-
-# Combine all Awarded Grants entries
-awarded_mask = df['Legend'] == 'Awarded grants'
-awarded_total = df[awarded_mask].sum(numeric_only=True)
-df = df[~awarded_mask]  # Remove individual awarded grant rows
-
-# Create a new row for the combined awarded grants with the correct total
-awarded_row = pd.DataFrame({
-    'Legend': ['Awarded grants'],
-    'Source': ['Awarded grants'],
-    '2018': [0],
-    '2019': [0],
-    '2020': [0],
-    '2021': [0],
-    '2022': [0],
-    '2023': [0],
-    '2024': [3522000],  # Updated to exactly 3.522MM
-    '2025': [0],
-    '2026': [0],
-    '2027': [0],
-    '2028': [0],
-    '2029': [0]
-})
-
-df = pd.concat([df, awarded_row], ignore_index=True)
-
-# Remove rows where all numeric values are 0 or null
-df = df[df[numeric_columns].sum(axis=1) != 0]
-
-# Calculate totals up to 2024 for pie and bar charts
-df['Historical_Total'] = df[historical_years].sum(axis=1)
-
-# Calculate forecast totals (2025-2029)
-forecast_years = ['2025', '2026', '2027', '2028', '2029']
-df['Forecast_Total'] = df[forecast_years].sum(axis=1)
-
-# Define custom category order only
-category_order = [
-    'Industrial Research Funds',
-    'EBI Squared',
-    'Industrial Research Subawards',
-    'Awarded grants',
-    'EBI-Shell Administration fee'
-]
+start_year, end_year = time_series_year_range
 
 # 1. Historical Pie Chart
 st.subheader("EBI Lookback")
-# Prepare data for pie chart
-pie_data = df[~df['Source'].str.contains('NSF', na=False)].copy()
-# Filter out Finance Data
-pie_data = pie_data[pie_data['Source'] != 'Finance Data'].copy()
-totals = pie_data[historical_years].sum(axis=1)
-pie_data = pie_data[totals > 0].copy()
-pie_data['Total'] = totals[totals > 0] / 1_000_000
+# Funding per source over the selected years, from per-source prefix sums
+totals = tables.get("berkeley_source_totals").total(start_year, end_year)
+pie_data = (totals[totals > 0] / 1_000_000).rename('Total').reset_index()
 
 # Create pie chart without custom colors
 fig_pie = go.Figure(data=[go.Pie(
@@ -148,14 +81,8 @@ fig_pie.update_layout(
 st.plotly_chart(fig_pie, use_container_width=True)
 
 # 2. Historical Bar Chart
-historical_data = df[~df['Source'].str.contains('NSF', na=False)].melt(
-    id_vars=['Legend', 'Source'],
-    value_vars=historical_years,
-    var_name='Year',
-    value_name='Funding'
-)
-# Filter out Finance Data
-historical_data = historical_data[historical_data['Source'] != 'Finance Data']
+# Lookback line items are pre-filtered and sorted by year, so this is a slice
+historical_data = berkeley.year_slice(tables.get("berkeley_history"), start_year, end_year)
 
 fig_bar = px.bar(
     historical_data,
@@ -173,21 +100,15 @@ fig_bar.update_layout(
 st.plotly_chart(fig_bar, use_container_width=True)
 
 # 3. Forecast Chart
-forecast_data = df.melt(
-    id_vars=['Legend', 'Source'],
-    value_vars=forecast_years,
-    var_name='Year',
-    value_name='Funding'
-)
-# Filter out Finance Data
-forecast_data = forecast_data[forecast_data['Source'] != 'Finance Data']
+forecast_data = tables.get("berkeley_forecast")
+forecast_years = forecast_data['Year'].unique()
 
 fig_forecast = px.bar(
     forecast_data,
     x='Year',
     y='Funding',
     color='Source',
-    title='Funding Forecast (2025-2029)',
+    title=f'Funding Forecast ({forecast_years.min()}-{forecast_years.max()})' if len(forecast_years) else 'Funding Forecast',
     labels={'Source': 'Category'}
 )
 fig_forecast.update_layout(
@@ -197,6 +118,75 @@ fig_forecast.update_layout(
 )
 st.plotly_chart(fig_forecast, use_container_width=True)
 
+
+# 4. Simulated outlook
+@st.cache_data(max_entries=64, show_spinner=False)
+def simulated_outlook(kind, growth, volatility, renewal, version):
+    """
+    P10/P50/P90 bands of the simulated outlook, computed once per set of
+    assumptions and data version.
+    """
+    model = tables.get("forecast_model")
+    return forecast.bands(model, forecast.simulate(model, kind=kind, growth=growth,
+                                                   volatility=volatility, renewal=renewal))
+
+
+@st.fragment
+def simulated_outlook_section():
+    st.subheader("Simulated Outlook")
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        kind = st.selectbox("Model", forecast.MODELS, format_func=str.title, key="outlook_model",
+                            help="Growth: compounding yearly growth fitted to the actuals. "
+                                 "Trend: straight-line trend fitted to the actuals.")
+    with col2:
+        growth = st.slider("Growth adjustment (pts/yr)", -10, 10, 0, key="outlook_growth",
+                           help="Added to every line item's fitted yearly growth")
+    with col3:
+        volatility = st.slider("Volatility (x fitted)", 0.5, 2.0, 1.0, 0.1, key="outlook_volatility")
+    with col4:
+        renewal = st.slider("Yearly renewal probability (%)", 50, 100, 90, key="outlook_renewal",
+                            help="Chance a line item is still funded each year; once lapsed it stays at zero")
+
+    outlook = simulated_outlook(kind, growth / 100, volatility, renewal / 100,
+                                tables.graph.version("forecast_model"))
+    # Line items are (Legend, Source); the Legend is shown only where a Source name repeats
+    items = outlook[['Legend', 'Source']].drop_duplicates()
+    repeated = set(items['Source'][items['Source'].duplicated(keep=False)])
+    legend, source = st.selectbox(
+        "Line item", list(items.itertuples(index=False, name=None)), key="outlook_source",
+        format_func=lambda item: f"{item[1]} ({item[0]})" if item[1] in repeated else item[1],
+    )
+    band = outlook[(outlook['Legend'] == legend) & (outlook['Source'] == source)]
+
+    fig_outlook = go.Figure([
+        go.Scatter(x=band['Year'], y=band['P90'], mode='lines', line=dict(width=0),
+                   name='P90', showlegend=False),
+        go.Scatter(x=band['Year'], y=band['P10'], mode='lines', line=dict(width=0), fill='tonexty',
+                   fillcolor='rgba(99, 110, 250, 0.2)', name='P10-P90'),
+        go.Scatter(x=band['Year'], y=band['P50'], mode='lines+markers', name='P50'),
+    ])
+    # The sheet's own forecast, for comparison
+    if legend == 'Total':
+        sheet = forecast_data
+    else:
+        sheet = forecast_data[(forecast_data['Legend'] == legend) & (forecast_data['Source'] == source)]
+    sheet = sheet.groupby('Year')['Funding'].sum()
+    if not sheet.empty:
+        fig_outlook.add_scatter(x=sheet.index, y=sheet.values, mode='lines+markers',
+                                line=dict(dash='dash'), name='Sheet forecast')
+    fig_outlook.update_layout(
+        title=f'Simulated Funding Outlook: {source} ({band["Year"].min()}-{band["Year"].max()})',
+        xaxis_title="Year",
+        yaxis_title="Funding ($)",
+        yaxis_tickformat='$,.0f'
+    )
+    st.plotly_chart(fig_outlook, use_container_width=True)
+    st.caption("10,000 simulated paths per line item; the band spans the 10th to 90th percentile.")
+
+
+simulated_outlook_section()
+
 # # Display the DataFrame
 # st.subheader("Raw Data")
 # st.dataframe(
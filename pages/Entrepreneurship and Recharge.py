@@ -1,6 +1,7 @@
 import streamlit as st
-from streamlit_gsheets import GSheetsConnection
-import pandas as pd
+import portfolio
+import tables
+import warmup
 import plotly.express as px
 from plotly import graph_objects as go
 
@@ -9,110 +10,138 @@ from plotly import graph_objects as go
 st.set_page_config(page_title="Entrepreneurship and Recharge", page_icon="🔍", layout="wide")
 st.title("🔍 Entrepreneurship and Recharge")
 
-# Create connection to Google Sheets
-conn = st.connection("gsheets_ebi2", type=GSheetsConnection)
-df = conn.read()
+# Warm every sheet in the background (once per cache period), in case this page
+# was opened directly rather than from the home page
+warmup.show_status(warmup.start())
+
+# Load the EBI² portfolio data, its company search index and its rollups
+df, company_index, rollups = tables.get("ebi2", "company_index", "portfolio")
+df = df.copy()
 
 # Clean column names by removing spaces and special characters
 df.columns = df.columns.str.strip().str.replace(' ', '_')
 
+# Filters select rollup cells; nothing below rescans the portfolio
+st.sidebar.header("Filters")
+industry_filter = st.sidebar.multiselect(
+    "Filter by Industry",
+    options=rollups.industries,
+    key="portfolio_industries"
+)
+
+first_founded, last_founded = rollups.founded_range
+year_filter = None
+if first_founded is not None and first_founded < last_founded:
+    year_filter = st.sidebar.slider(
+        "Filter by Founded Year",
+        min_value=first_founded,
+        max_value=last_founded,
+        value=(first_founded, last_founded),
+        key="portfolio_founded"
+    )
+    if year_filter == (first_founded, last_founded):
+        # Full range: keep companies without a founding year too
+        year_filter = None
+
+selected = rollups.select(industry_filter, year_filter)
+totals = rollups.totals(selected)
+
 # Top level metrics
 col1, col2, col3 = st.columns(3)
 
 with col1:
     st.metric(
         "Total Companies",
-        len(df),
-        delta=f"Since {df['Year_Founded'].min()}"
+        totals['Companies'],
+        delta=f"Since {totals['First Founded']}" if totals['First Founded'] else None
     )
 
 with col2:
-    total_raised = df['Total_Raised'].sum()
     st.metric(
         "Total Portfolio Funding",
-        f"${total_raised:,.0f}M"
+        f"${totals['Total Raised']:,.0f}M"
     )
 
 with col3:
-    total_employees = int(df['Employees'].sum())
     st.metric(
         "Total Employees",
-        f"{total_employees:,}"
+        f"{int(totals['Employees']):,}"
     )
 
-# Create connection to Google Sheets
-conn = st.connection("gsheets_berkeley", type=GSheetsConnection)
-berkeley_df = conn.read()
+# Berkeley funding line items, keyed by (Legend, Source)
+berkeley_index = tables.get("berkeley_index")
 
 # Extract years and values for the chart
 years = list(range(2018, 2026))  # Keep existing year range
 
-# Get EBI Recharge and EBI Squared data from berkeley_df
-ebi_squared_row = berkeley_df[berkeley_df['Legend'] == 'EBI Squared'].iloc[1]  # The EBI Squared row
-ebi_recharge_row = berkeley_df[berkeley_df['Legend'] == 'EBI Squared'].iloc[0]  # The EBI Recharge row
-
-# Extract values for the selected years
-ebi_squared_values = [float(str(ebi_squared_row[str(year)]).replace(',', '') or 0) for year in years]
-ebi_recharge_values = [float(str(ebi_recharge_row[str(year)]).replace(',', '')) for year in years]
-
-# Create stacked bar chart
-fig = go.Figure()
-
-# Add EBI Squared bars
-fig.add_trace(
-    go.Bar(
-        x=years,
-        y=ebi_squared_values,
-        name='EBI²',
-        text=[f"${x:,.0f}" for x in ebi_squared_values],
-        textposition='auto',
-        marker_color='#1f77b4'
+# EBI Squared and EBI Recharge amounts for the selected years, looked up by name
+try:
+    ebi_squared_values, ebi_recharge_values = berkeley_index.rows(
+        [('EBI Squared', 'EBI Squared'), ('EBI Squared', 'EBI Recharge')], years
     )
-)
+except KeyError as e:
+    # A renamed line item in the sheet; say so instead of charting zeros
+    st.warning(f"Annual budget chart unavailable. {e.args[0]}")
+else:
+    # Create stacked bar chart
+    fig = go.Figure()
 
-# Add EBI Recharge bars
-fig.add_trace(
-    go.Bar(
-        x=years,
-        y=ebi_recharge_values,
-        name='EBI Recharge',
-        text=[f"${x:,.0f}" for x in ebi_recharge_values],
-        textposition='auto',
-        marker_color='#2ca02c'
+    # Add EBI Squared bars
+    fig.add_trace(
+        go.Bar(
+            x=years,
+            y=ebi_squared_values,
+            name='EBI²',
+            text=[f"${x:,.0f}" for x in ebi_squared_values],
+            textposition='auto',
+            marker_color='#1f77b4'
+        )
     )
-)
 
-fig.update_layout(
-    title="Entrepreneurship and Recharge Annual Budget (2018-2025)",
-    xaxis_title="Year",
-    yaxis_title="Budget ($)",
-    barmode='stack',
-    height=500,
-    showlegend=True,
-    legend=dict(
-        orientation="h",
-        yanchor="bottom",
-        y=1.02,
-        xanchor="right",
-        x=1
+    # Add EBI Recharge bars
+    fig.add_trace(
+        go.Bar(
+            x=years,
+            y=ebi_recharge_values,
+            name='EBI Recharge',
+            text=[f"${x:,.0f}" for x in ebi_recharge_values],
+            textposition='auto',
+            marker_color='#2ca02c'
+        )
+    )
+
+    fig.update_layout(
+        title="Entrepreneurship and Recharge Annual Budget (2018-2025)",
+        xaxis_title="Year",
+        yaxis_title="Budget ($)",
+        barmode='stack',
+        height=500,
+        showlegend=True,
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=1.02,
+            xanchor="right",
+            x=1
+        )
     )
-)
 
-# Display chart
-st.plotly_chart(fig, use_container_width=True)
+    # Display chart
+    st.plotly_chart(fig, use_container_width=True)
 
 # Create two columns for main charts
 left_column, right_column = st.columns(2)
 
 with left_column:
     # Funding by Industry
-    industry_funding = df.groupby('Primary_Industry_Code')['Total_Raised'].sum().sort_values(ascending=True)
-    
+    industry_rollup = rollups.rollup(portfolio.INDUSTRY, selected)
+    industry_funding = industry_rollup['Total Raised'].sort_values(ascending=True)
+
     fig1 = px.bar(
         industry_funding,
         orientation='h',
         title="Total Funding by Industry",
-        labels={'value': 'Total Raised ($M)', 'Primary_Industry_Code': 'Industry'}
+        labels={'value': 'Total Raised ($M)', portfolio.INDUSTRY: 'Industry'}
     )
     fig1.update_layout(height=400)
     st.plotly_chart(fig1, use_container_width=True)
@@ -120,29 +149,64 @@ with left_column:
 
 with right_column:
     # Employee distribution by industry
-    industry_employees = df.groupby('Primary_Industry_Code')['Employees'].sum().sort_values(ascending=True)
-    
+    industry_employees = industry_rollup['Employees'].sort_values(ascending=True)
+
     fig2 = px.bar(
         industry_employees,
         orientation='h',
         title="Total Employees by Industry",
-        labels={'value': 'Number of Employees', 'Primary_Industry_Code': 'Industry'}
+        labels={'value': 'Number of Employees', portfolio.INDUSTRY: 'Industry'}
     )
     fig2.update_layout(height=400)
     st.plotly_chart(fig2, use_container_width=True)
 
+# Founding-year cohorts and financing stages
+left_column, right_column = st.columns(2)
+
+with left_column:
+    cohorts = rollups.rollup(portfolio.FOUNDED, selected).reset_index()
+    fig_cohorts = px.bar(
+        cohorts,
+        x=portfolio.FOUNDED,
+        y='Companies',
+        hover_data={'Total Raised': ':,.1f', 'Median Total Raised': ':,.1f'},
+        title="Companies by Founding Year",
+        labels={portfolio.FOUNDED: 'Year Founded', 'Total Raised': 'Total Raised ($M)',
+                'Median Total Raised': 'Median Raised ($M)'}
+    )
+    fig_cohorts.update_layout(height=400)
+    st.plotly_chart(fig_cohorts, use_container_width=True)
+
+with right_column:
+    stages = rollups.rollup(portfolio.STAGE, selected).sort_values('Total Raised').reset_index()
+    fig_stages = px.bar(
+        stages,
+        x='Total Raised',
+        y=portfolio.STAGE,
+        orientation='h',
+        hover_data={'Companies': True, 'Median Total Raised': ':,.1f'},
+        title="Total Funding by Last Financing Stage",
+        labels={'Total Raised': 'Total Raised ($M)', portfolio.STAGE: 'Stage',
+                'Median Total Raised': 'Median Raised ($M)'}
+    )
+    fig_stages.update_layout(height=400)
+    st.plotly_chart(fig_stages, use_container_width=True)
+
 # Create single column for additional chart
 col1 = st.columns(1)[0]
 
 with col1:
-    # Funds raised by company (top 10)
-    company_funding = df.nlargest(10, 'Total_Raised')[['Company', 'Total_Raised']]
+    # Top 10 companies by funds raised or by employees
+    rank_by = st.radio("Rank companies by", ['Total Raised', 'Employees'], horizontal=True,
+                       key="portfolio_rank_by")
+    top_companies = rollups.top(rank_by, selected)
     fig3 = px.bar(
-        company_funding,
+        top_companies,
         x='Company',
-        y='Total_Raised',
-        title="Top 10 Companies by Funds Raised",
-        labels={'Total_Raised': 'Total Raised ($M)', 'Company': 'Company Name'}
+        y=rank_by,
+        title=f"Top 10 Companies by {'Funds Raised' if rank_by == 'Total Raised' else 'Employees'}",
+        labels={'Total Raised': 'Total Raised ($M)', 'Employees': 'Number of Employees',
+                'Company': 'Company Name'}
     )
     # Rotate x-axis labels for better readability
     fig3.update_layout(
@@ -156,46 +220,46 @@ with col1:
 st.markdown("---")
 st.header("Company Details")
 
-# Searchable company table
-search = st.text_input("Search Companies", "")
-if search:
-    filtered_df = df[df['Company'].str.contains(search, case=False)]
-else:
-    filtered_df = df
-
-# Show interactive table with key columns
-st.dataframe(
-    filtered_df[[
-        'Company', 
-        'Total_Raised',
-        'Employees',
-        'Primary_Industry_Code',
-        'Last_Financing_Date',
-        'Last_Financing_Size',
-        'Website'
-    ]],
-    hide_index=True
-)
+# Searchable company table, backed by an index built once per refresh
+def use_suggestion(name):
+    st.session_state["company_search"] = name
 
-# # Add filters in the sidebar
-# st.sidebar.header("Filters")
-# industry_filter = st.sidebar.multiselect(
-#     "Filter by Industry",
-#     options=sorted(df['Primary_Industry_Code'].unique())
-# )
 
-# year_filter = st.sidebar.slider(
-#     "Filter by Founded Year",
-#     min_value=int(df['Year_Founded'].min()),
-#     max_value=int(df['Year_Founded'].max()),
-#     value=(int(df['Year_Founded'].min()), int(df['Year_Founded'].max()))
-# )
+# Only this section reruns while typing in the search box
+@st.fragment
+def company_details_section():
+    # Companies passing the sidebar filters
+    portfolio_df = df if selected is None else df.loc[rollups.rows(selected)]
+    search = st.text_input("Search Companies", "", key="company_search")
+    if search:
+        matches = company_index.match(search)
+        filtered_df = df.loc[matches[matches.isin(portfolio_df.index)]]
+
+        # Type-ahead suggestions, unless the search already names a company
+        suggestions = [name for name in company_index.suggest(search) if name != search]
+        if suggestions:
+            suggestion_columns = st.columns(len(suggestions))
+            for column, name in zip(suggestion_columns, suggestions):
+                column.button(name, key=f"suggest_{name}", on_click=use_suggestion, args=(name,))
+    else:
+        filtered_df = portfolio_df
+
+    # Show interactive table with key columns
+    st.dataframe(
+        filtered_df[[
+            'Company', 
+            'Total_Raised',
+            'Employees',
+            'Primary_Industry_Code',
+            'Last_Financing_Date',
+            'Last_Financing_Size',
+            'Website'
+        ]],
+        hide_index=True
+    )
+
 
-# # Apply filters if selected
-# if industry_filter:
-#     df = df[df['Primary_Industry_Code'].isin(industry_filter)]
-# if year_filter:
-#     df = df[df['Year_Founded'].between(year_filter[0], year_filter[1])]
+company_details_section()
 
 # # Display the dataframe with column filters and sorting capabilities
 # st.subheader("Raw Data")
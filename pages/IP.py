@@ -1,13 +1,17 @@
 import streamlit as st
-import pandas as pd
 import plotly.express as px
-from streamlit_gsheets import GSheetsConnection
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail
+import cases
+import outbox
+import tables
+import warmup
 
 # Set up the Streamlit page configuration with a wide layout and IP Dashboard title/icon
 st.set_page_config(page_title="IP Dashboard", page_icon="📄",layout="wide")
 st.title("📄 IP Dashboard")
+
+# Warm every sheet in the background (once per cache period), in case this page
+# was opened directly rather than from the home page
+warmup.show_status(warmup.start())
 st.write(
     """
     This app displays Intellectual Property data from a Google Sheet, organized by industry,
@@ -15,14 +19,59 @@ st.write(
     """
 )
 
-# Create connection to Google Sheets using the gsheets_ip connection defined in secrets.toml
-conn = st.connection("gsheets_ip", type=GSheetsConnection)
-# Read the data from the connected Google Sheet into a pandas DataFrame
-df = conn.read()
+# Read the IP data (gsheets_ip connection), with PI names unified across sheets
+df = tables.get("patents").copy()
 
 # Convert the Application Year column to string type for consistent display
 df['Application_YR'] = df['Application_YR'].astype(str)
 
+# Distinct patent counts by every charted dimension, and row bitsets for
+# cross-filtering, both built once per refresh
+cube, bitmaps = tables.get("patent_cube", "patent_bitmaps")
+
+# Dimensions that clicking a chart filters by
+CROSS_FILTERS = ['Sponsor', 'Program', 'PI', 'Institution']
+
+
+def add_chart_selection(dim, chart_key):
+    # Add the bars/slices selected on a chart to that dimension's filter
+    points = st.session_state[chart_key].selection.points
+    selected = [point.get('label', point.get('x')) for point in points]
+    selected = [value for value in selected if value in bitmaps.bitmaps[dim]]
+    current = st.session_state.get(f"ip_filter_{dim}", [])
+    st.session_state[f"ip_filter_{dim}"] = current + [value for value in selected if value not in current]
+
+
+def clear_filters():
+    for dim in CROSS_FILTERS:
+        st.session_state[f"ip_filter_{dim}"] = []
+
+
+# Cross-filter bar: values picked here or by clicking a chart filter every other chart
+st.write("Click bars or slices to filter the dashboard; selections combine across charts.")
+filter_columns = st.columns(len(CROSS_FILTERS) + 1)
+for column, dim in zip(filter_columns, CROSS_FILTERS):
+    with column:
+        st.multiselect(dim, list(bitmaps.values[dim]), key=f"ip_filter_{dim}")
+with filter_columns[-1]:
+    st.button("Clear filters", on_click=clear_filters)
+
+filters = {dim: st.session_state[f"ip_filter_{dim}"] for dim in CROSS_FILTERS if st.session_state[f"ip_filter_{dim}"]}
+
+
+def patent_counts(dim):
+    # Distinct patents per value of dim under the other dimensions' filters
+    return bitmaps.by(dim, filters) if filters else cube.by(dim)
+
+
+def sponsor_ips(sponsor):
+    # Distinct patents of one sponsor under the current filters
+    if not filters:
+        return cube.count('Sponsor', sponsor)
+    if filters.get('Sponsor') and sponsor not in filters['Sponsor']:
+        return 0
+    return bitmaps.count({**filters, 'Sponsor': [sponsor]})
+
 
 # Show some metrics and charts about the data
 # Display header for IP metrics section
@@ -33,16 +82,16 @@ col1, col2, col3, col4, col5 = st.columns(5)
 
 # Display total number of unique inventions
 with col1:
-    st.metric(label="GlobalIPs📝", value=df['Patent Title'].nunique())
+    st.metric(label="GlobalIPs📝", value=bitmaps.count(filters) if filters else cube.count())
 
 # Display number of Shell inventions by filtering Company column
 with col2:
-    shell_ips = df[df['Sponsor'] == 'Shell']['Patent Title'].nunique()
+    shell_ips = sponsor_ips('Shell')
     st.metric(label="Total Shell IPs🐚", value=shell_ips)
 
 # Display number of BP inventions by filtering Company column  
 with col3:
-    bp_ips = df[df['Sponsor'] == 'BP']['Patent Title'].nunique()
+    bp_ips = sponsor_ips('BP')
     st.metric(label="Total BP IPs☀️", value=bp_ips)
 
 # Display sum of Shell and BP IPs
@@ -51,7 +100,8 @@ with col4:
 
 # Display total number of unique Principal Investigators
 with col5:
-    st.metric(label="Total PI's 👨‍🔬", value=df['PI'].nunique())
+    total_pis = len(bitmaps.by('PI', filters, cross=False)) if filters else cube.distinct['PI']
+    st.metric(label="Total PI's 👨‍🔬", value=total_pis)
 
 
 
@@ -66,7 +116,7 @@ col7, col8, = st.columns([0.5, 0.5])
 
 with col5:
     # Count number of patents per program
-    program_counts = df.groupby('Program')['Patent Title'].nunique()
+    program_counts = patent_counts('Program')
 
     # Create pie chart showing patent distribution across programs
     fig = px.pie(
@@ -87,10 +137,11 @@ with col5:
         yaxis_title="Number of Patents"
     )
 
-    st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(fig, use_container_width=True, key="ip_chart_Program",
+                    on_select=lambda: add_chart_selection('Program', "ip_chart_Program"))
 
     # Create bar chart showing total patent counts by company (needed for col6)
-    company_counts = df.groupby('Sponsor')['Patent Title'].nunique().reset_index()
+    company_counts = patent_counts('Sponsor').reset_index()
 
 
 
@@ -111,11 +162,12 @@ with col6:
         yaxis_title="Number of Patents"
     )
 
-    st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(fig, use_container_width=True, key="ip_chart_Sponsor",
+                    on_select=lambda: add_chart_selection('Sponsor', "ip_chart_Sponsor"))
     
 with col7:
     # Count number of IPs per PI
-    pi_counts = df.groupby('PI')['Patent Title'].nunique().reset_index()
+    pi_counts = patent_counts('PI').reset_index()
     pi_counts = pi_counts.sort_values('Patent Title', ascending=False)
 
     fig = px.bar(pi_counts,
@@ -133,12 +185,13 @@ with col7:
         yaxis_title="Number of IPs"
     )
 
-    st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(fig, use_container_width=True, key="ip_chart_PI",
+                    on_select=lambda: add_chart_selection('PI', "ip_chart_PI"))
 
 
 with col8:
     # Count number of patents per institution and calculate percentages
-    institution_counts = df.groupby('Institution')['Patent Title'].nunique().reset_index()
+    institution_counts = patent_counts('Institution').reset_index()
     institution_counts['Percentage'] = (institution_counts['Patent Title'] / institution_counts['Patent Title'].sum()) * 100
 
     # Create pie chart showing distribution of patents across institutions
@@ -158,7 +211,8 @@ with col8:
     # Add percentage labels to pie slices
     fig.update_traces(textposition='inside', textinfo='percent+label')
 
-    st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(fig, use_container_width=True, key="ip_chart_Institution",
+                    on_select=lambda: add_chart_selection('Institution', "ip_chart_Institution"))
 
 
 
@@ -166,150 +220,214 @@ with col8:
 st.header("Custom Charts")
 st.write("Create custom charts by selecting variables to compare")
 
-# Create columns for variable and chart type selection
-col_select1, col_select2, col_select3 = st.columns(3)
-
-with col_select1:
-    # First variable selector
-    x_var = st.selectbox(
-        "Select X-axis variable",
-        options=['PI', 'Institution', 'Filing Type', 'Lead Inv Dept', 'Lead Sponsor'],
-        help="Choose the variable for the X-axis"
-    )
-
-with col_select2:
-    # Second variable selector for y-axis metric
-    y_metric = st.selectbox(
-        "Select analysis metric",
-        options=['Count', 'Percentage'],
-        help="Choose how to measure the data"
-    )
-
-with col_select3:
-    # Chart type selector
-    chart_type = st.selectbox(
-        "Select chart type",
-        options=['Bar Chart', 'Pie Chart', 'Line Chart', 'Scatter Plot'],
-        help="Choose the type of chart to display"
-    )
+# Only this section reruns when its selectors change
+@st.fragment
+def custom_chart_section():
+    # Create columns for variable and chart type selection
+    col_select1, col_select2, col_select3 = st.columns(3)
+
+    with col_select1:
+        # First variable selector
+        x_var = st.selectbox(
+            "Select X-axis variable",
+            options=['PI', 'Institution', 'Filing Type', 'Lead Inv Dept', 'Lead Sponsor'],
+            help="Choose the variable for the X-axis"
+        )
+
+    with col_select2:
+        # Second variable selector for y-axis metric
+        y_metric = st.selectbox(
+            "Select analysis metric",
+            options=['Count', 'Percentage'],
+            help="Choose how to measure the data"
+        )
+
+    with col_select3:
+        # Chart type selector
+        chart_type = st.selectbox(
+            "Select chart type",
+            options=['Bar Chart', 'Pie Chart', 'Line Chart', 'Scatter Plot'],
+            help="Choose the type of chart to display"
+        )
+
+    # Generate dynamic chart based on selections
+    # Counts come from the precomputed cube, so changing a selector does no grouping
+    custom_counts = (bitmaps.by(x_var, filters, cross=False) if filters else cube.by(x_var)).reset_index()
+
+    if y_metric == 'Percentage':
+        custom_counts['Value'] = (custom_counts['Patent Title'] / custom_counts['Patent Title'].sum()) * 100
+        y_axis_title = "Percentage (%)"
+    else:
+        custom_counts['Value'] = custom_counts['Patent Title']
+        y_axis_title = "Count"
+
+    # Create dynamic chart based on selected type
+    if chart_type == 'Bar Chart':
+        fig = px.bar(custom_counts,
+                    x=x_var,
+                    y='Value',
+                    title=f'{y_metric} of IPs by {x_var}',
+                    labels={x_var: x_var, 'Value': y_axis_title},
+                    height=500)
 
-# Generate dynamic chart based on selections
-custom_counts = df.groupby(x_var)['Patent Title'].nunique().reset_index()
-
-if y_metric == 'Percentage':
-    custom_counts['Value'] = (custom_counts['Patent Title'] / custom_counts['Patent Title'].sum()) * 100
-    y_axis_title = "Percentage (%)"
-else:
-    custom_counts['Value'] = custom_counts['Patent Title']
-    y_axis_title = "Count"
-
-# Create dynamic chart based on selected type
-if chart_type == 'Bar Chart':
-    fig = px.bar(custom_counts,
-                x=x_var,
-                y='Value',
-                title=f'{y_metric} of IPs by {x_var}',
-                labels={x_var: x_var, 'Value': y_axis_title},
-                height=500)
-    
-    fig.update_layout(
-        xaxis_tickangle=-45,
-        showlegend=False,
-        margin=dict(b=100),
-        yaxis_title=y_axis_title
-    )
+        fig.update_layout(
+            xaxis_tickangle=-45,
+            showlegend=False,
+            margin=dict(b=100),
+            yaxis_title=y_axis_title
+        )
+
+    elif chart_type == 'Pie Chart':
+        fig = px.pie(custom_counts,
+                    values='Value',
+                    names=x_var,
+                    title=f'Distribution of IPs by {x_var} ({y_metric})',
+                    height=500)
 
-elif chart_type == 'Pie Chart':
-    fig = px.pie(custom_counts,
-                values='Value',
-                names=x_var,
-                title=f'Distribution of IPs by {x_var} ({y_metric})',
-                height=500)
-    
-    fig.update_layout(
-        showlegend=True,
-        legend_title=x_var,
-        margin=dict(b=50)
-    )
-    
-    fig.update_traces(textposition='inside', textinfo='percent+label')
+        fig.update_layout(
+            showlegend=True,
+            legend_title=x_var,
+            margin=dict(b=50)
+        )
 
-elif chart_type == 'Line Chart':
-    fig = px.line(custom_counts,
-                x=x_var,
-                y='Value',
-                title=f'{y_metric} of IPs by {x_var}',
-                labels={x_var: x_var, 'Value': y_axis_title},
-                height=500)
-    
-    fig.update_layout(
-        xaxis_tickangle=-45,
-        showlegend=False,
-        margin=dict(b=100),
-        yaxis_title=y_axis_title
-    )
+        fig.update_traces(textposition='inside', textinfo='percent+label')
 
-else:  # Scatter Plot
-    fig = px.scatter(custom_counts,
+    elif chart_type == 'Line Chart':
+        fig = px.line(custom_counts,
                     x=x_var,
                     y='Value',
                     title=f'{y_metric} of IPs by {x_var}',
                     labels={x_var: x_var, 'Value': y_axis_title},
                     height=500)
-    
-    fig.update_layout(
-        xaxis_tickangle=-45,
-        showlegend=False,
-        margin=dict(b=100),
-        yaxis_title=y_axis_title
+
+        fig.update_layout(
+            xaxis_tickangle=-45,
+            showlegend=False,
+            margin=dict(b=100),
+            yaxis_title=y_axis_title
+        )
+
+    else:  # Scatter Plot
+        fig = px.scatter(custom_counts,
+                        x=x_var,
+                        y='Value',
+                        title=f'{y_metric} of IPs by {x_var}',
+                        labels={x_var: x_var, 'Value': y_axis_title},
+                        height=500)
+
+        fig.update_layout(
+            xaxis_tickangle=-45,
+            showlegend=False,
+            margin=dict(b=100),
+            yaxis_title=y_axis_title
+        )
+
+    st.plotly_chart(fig, use_container_width=True)
+
+
+custom_chart_section()
+
+# Form to submit new IP
+st.header("Submit New Case")
+with st.form("ip_form"):
+    case_no = st.text_input("Case Number")
+    case_title = st.text_input("Case Title")
+    lead_inv = st.text_input("Lead Inventor")
+    mktg_stat = st.selectbox("Marketing Status", df['Mktg Stat'].dropna().unique())
+    pros_stat = st.selectbox("Prosecution Status", df['Pros Stat'].dropna().unique())
+    filing_type = st.selectbox("Filing Type", df['Filing Type'].dropna().unique())
+    us_app_no = st.text_input("US Application Number")
+    us_app_dt = st.date_input("US Application Date")
+    lead_sponsor = st.text_input("Lead Sponsor")
+    lead_inv_dept = st.selectbox("Lead Inventor Department", df['Lead Inv Dept'].dropna().unique())
+    submitted = st.form_submit_button("Submit")
+
+# Approval emails go through the outbox: it is queued locally and sent in the
+# background, so a slow mail API never holds up the page
+mail = outbox.start()
+
+# Submitted cases are stored locally and shown on the dashboard until they are
+# approved and synced to the IP sheet
+case_store = cases.CaseStore()
+
+if submitted:
+    try:
+        case_store.submit(
+            case_no=case_no,
+            title=case_title,
+            lead_inventor=lead_inv,
+            mktg_stat=mktg_stat,
+            pros_stat=pros_stat,
+            filing_type=filing_type,
+            us_app_no=us_app_no,
+            us_app_date=us_app_dt,
+            lead_sponsor=lead_sponsor,
+            lead_inv_dept=lead_inv_dept,
+        )
+    except ValueError as e:
+        st.error(f"Case not submitted: {e}")
+    else:
+        # Modify email content for new schema
+        mail.enqueue(
+            sender='iyanjgodwin@gmail.com',
+            recipient='iyanjgodwin@gmail.com',
+            subject='New Case Submission',
+            body=f"""
+            New Case Submission:
+            Case Number: {case_no}
+            Case Title: {case_title}
+            Lead Inventor: {lead_inv}
+            Marketing Status: {mktg_stat}
+            Prosecution Status: {pros_stat}
+            Filing Type: {filing_type}
+            US Application Number: {us_app_no}
+            US Application Date: {us_app_dt}
+            Lead Sponsor: {lead_sponsor}
+            Lead Inventor Department: {lead_inv_dept}
+            """
+        )
+        st.success("Case submitted; the approval email is queued and will be sent shortly.")
+
+# Outbox health
+mail_stats = mail.stats()
+status = f"Approval emails: {mail_stats['pending']} queued, {mail_stats['sent']} sent, {mail_stats['failed']} failed"
+if mail_stats['delivery_latency'] is not None:
+    status += f", delivered in {mail_stats['delivery_latency']:.1f}s on average"
+st.caption(status)
+
+# Approve or reject submitted cases, and push approved ones to the IP sheet
+with st.expander("Case approvals"):
+    counts = case_store.status_counts()
+    st.caption(", ".join(f"{counts.get(status, 0)} {status}" for status in cases.TRANSITIONS))
+
+    open_cases = case_store.cases(["submitted", "approved"])
+    st.dataframe(
+        open_cases[['case_no', 'title', 'lead_inventor', 'filing_type', 'status']],
+        use_container_width=True,
+        hide_index=True
     )
 
-st.plotly_chart(fig, use_container_width=True)
-
-# # Form to submit new IP
-# st.header("Submit New Case")
-# with st.form("ip_form"):
-#     case_no = st.text_input("Case Number")
-#     case_title = st.text_input("Case Title")
-#     lead_inv = st.text_input("Lead Inventor")
-#     mktg_stat = st.selectbox("Marketing Status", df['Mktg Stat'].unique())
-#     pros_stat = st.selectbox("Prosecution Status", df['Pros Stat'].unique())
-#     filing_type = st.selectbox("Filing Type", df['Filing Type'].unique())
-#     us_app_no = st.text_input("US Application Number")
-#     us_app_dt = st.date_input("US Application Date")
-#     lead_sponsor = st.text_input("Lead Sponsor")
-#     lead_inv_dept = st.selectbox("Lead Inventor Department", df['Lead Inv Dept'].unique())
-#     submitted = st.form_submit_button("Submit")
-
-# if submitted:
-#     # Modify email content for new schema
-#     message = Mail(
-#         from_email='iyanjgodwin@gmail.com',
-#         to_emails='iyanjgodwin@gmail.com',
-#         subject='New Case Submission',
-#         plain_text_content=f"""
-#         New Case Submission:
-#         Case Number: {case_no}
-#         Case Title: {case_title}
-#         Lead Inventor: {lead_inv}
-#         Marketing Status: {mktg_stat}
-#         Prosecution Status: {pros_stat}
-#         Filing Type: {filing_type}
-#         US Application Number: {us_app_no}
-#         US Application Date: {us_app_dt}
-#         Lead Sponsor: {lead_sponsor}
-#         Lead Inventor Department: {lead_inv_dept}
-#         """
-#     )
-
-#     try:
-#         sg = SendGridAPIClient(st.secrets["sendgrid"]["api_key"])
-#         response = sg.send(message)
-#         st.success("Case submitted and email sent for approval.")
-#     except Exception as e:
-#         st.error(f"Error sending email: {e}")
-
-# Note: The actual writing to a database after approval is not implemented here.
+    submitted_cases = open_cases.loc[open_cases['status'] == 'submitted', 'case_no'].tolist()
+    col1, col2, col3 = st.columns([2, 1, 1])
+    with col1:
+        review_case = st.selectbox("Case to review", submitted_cases, index=None)
+    with col2:
+        if st.button("Approve", disabled=review_case is None):
+            case_store.transition(review_case, "approved")
+            st.rerun()
+    with col3:
+        if st.button("Reject", disabled=review_case is None):
+            case_store.transition(review_case, "rejected")
+            st.rerun()
+
+    approved = counts.get("approved", 0)
+    if st.button(f"Sync {approved} approved cases to the IP sheet", disabled=not approved):
+        try:
+            cases.sync_to_sheet(case_store)
+        except Exception as e:
+            st.error(f"Sync failed, approved cases will be retried: {e}")
+        else:
+            st.rerun()
 
 
 ##bp and shell pie chart
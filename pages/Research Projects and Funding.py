@@ -1,121 +1,96 @@
 import streamlit as st
-import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from streamlit_gsheets import GSheetsConnection
+import data
+import deliverables
+import search
+import tables
+import warmup
+from tableview import paged_table
 
 st.set_page_config(page_title="Research Dashboard", page_icon="📊", layout="wide")
 st.title("Research Projects and Funding Dashboard")
 
-@st.cache_data(ttl=600)
-def load_data():
-    conn_dashboard = st.connection("gsheets_dashboard", type=GSheetsConnection)
-    conn_funding = st.connection("gsheets_funding", type=GSheetsConnection)
-    return conn_dashboard.read(), conn_funding.read()
+# Warm every sheet in the background (once per cache period), in case this page
+# was opened directly rather than from the home page
+warmup.show_status(warmup.start())
 
-# This function removes duplicate projects and consolidates Principle Investigator names
-def consolidate_data(df):
-    # Remove duplicate rows based on "Project Name"
-    df = df.drop_duplicates(subset=["Project Name"], keep="first")
-    
-    # First, fill NaN values with a placeholder or remove rows with NaN PIs
-    df = df.dropna(subset=['Principle Investigator'])  # Remove rows where PI is NaN
-    
-    # Use simple approximate matching to unify PI names
-    import difflib
-    name_map = {}
-    for pi_name in df['Principle Investigator'].unique():
-        best_match = difflib.get_close_matches(pi_name, list(name_map.keys()), n=1, cutoff=0.8)
-        if best_match:
-            name_map[pi_name] = best_match[0]
-        else:
-            name_map[pi_name] = pi_name
-            
-    df['Principle Investigator'] = df['Principle Investigator'].apply(lambda x: name_map[x])
-    return df
-
-projects_df, funding_df = load_data()
-projects_df = consolidate_data(projects_df)
+# Deduplicated projects with consolidated PI names
+projects_df = tables.get("projects")
 
 
 
 # Advanced search functionality
-def search_dataframe(df, search_term):
+def search_dataframe(df, search_term, search_type="All"):
     """
-    Search across multiple columns and return matching rows with highlighted search results
+    Search the fields selected by search_type and return the matching rows,
+    best matches first, with the fields each row matched in
     """
     if not search_term:
         return df, None
-    
-    # Define columns to search in
-    search_columns = [
-        "Discipline", "Program", "Project Name", "Principle Investigator",
-        "Personnel", "Institution", "Productivity and Deliverables", "Sponsor"
-    ]
-    
-    # Create a mask for each column
-    masks = []
-    for col in search_columns:
-        if col in df.columns:  # Check if column exists
-            masks.append(df[col].astype(str).str.contains(search_term, case=False, na=False))
-    
-    # Combine all masks with OR operation
-    final_mask = pd.concat(masks, axis=1).any(axis=1)
-    return df[final_mask], final_mask
 
-# Create search interface
-st.write("### Search Projects and PIs")
-col1, col2 = st.columns([3, 1])
-with col1:
-    search_term = st.text_input("Search across all fields", "")
-with col2:
-    search_type = st.selectbox(
-        "Filter by",
-        ["All", "PI", "Institution", "Program", "Discipline"]
-    )
-
-if search_term:
-    filtered_df, mask = search_dataframe(projects_df, search_term)
-    
-    if not filtered_df.empty:
-        st.write(f"Found {len(filtered_df)} matching results")
-        
-        # If searching specifically for a PI
-        if search_type == "PI":
-            pi_projects = filtered_df.groupby("Principle Investigator")
-            
-            for pi, projects in pi_projects:
-                with st.expander(f"📊 {pi} ({len(projects)} projects)"):
-                    # PI Summary
-                    st.write("#### Summary")
-                    col1, col2, col3 = st.columns(3)
-                    with col1:
-                        st.metric("Total Projects", len(projects))
-                    with col2:
-                        st.metric("Institutions", projects['Institution'].nunique())
-                    with col3:
-                        st.metric("Programs", projects['Program'].nunique())
-                    
-                    # Project Details
-                    st.write("#### Projects")
-                    for _, project in projects.iterrows():
-                        with st.container():
-                            st.markdown(f"""
-                            **Project:** {project['Project Name']}  
-                            **Program:** {project['Program']}  
-                            **Institution:** {project['Institution']}  
-                            **Deliverables:** {project['Productivity and Deliverables']}
-                            ---
-                            """)
+    # Inverted index over the searchable columns, built once per refresh
+    hits = tables.get("search_index").search(search_term, search.FIELDS[search_type])
+    return df.loc[hits.index], hits
+
+
+# Each widget section below is a fragment: interacting with it reruns only
+# that section, not the whole page
+@st.fragment
+def search_section():
+    # Create search interface
+    st.write("### Search Projects and PIs")
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        search_term = st.text_input("Search across all fields", "")
+    with col2:
+        search_type = st.selectbox(
+            "Filter by",
+            ["All", "PI", "Institution", "Program", "Discipline"]
+        )
+
+    if search_term:
+        filtered_df, hits = search_dataframe(projects_df, search_term, search_type)
+
+        if not filtered_df.empty:
+            st.write(f"Found {len(filtered_df)} matching results")
+
+            # If searching specifically for a PI
+            if search_type == "PI":
+                pi_projects = filtered_df.groupby("Principle Investigator", observed=True)
+
+                for pi, projects in pi_projects:
+                    with st.expander(f"📊 {pi} ({len(projects)} projects)"):
+                        # PI Summary
+                        st.write("#### Summary")
+                        col1, col2, col3 = st.columns(3)
+                        with col1:
+                            st.metric("Total Projects", len(projects))
+                        with col2:
+                            st.metric("Institutions", projects['Institution'].nunique())
+                        with col3:
+                            st.metric("Programs", projects['Program'].nunique())
+
+                        # Project Details
+                        st.write("#### Projects")
+                        for _, project in projects.iterrows():
+                            with st.container():
+                                st.markdown(f"""
+                                **Project:** {search.highlight(project['Project Name'], search_term)}  
+                                **Program:** {search.highlight(project['Program'], search_term)}  
+                                **Institution:** {search.highlight(project['Institution'], search_term)}  
+                                **Deliverables:** {search.highlight(project['Productivity and Deliverables'], search_term)}
+                                ---
+                                """)
+            else:
+                # Display regular search results, with the fields each row matched in
+                results_df = filtered_df.assign(**{'Matched In': hits['Fields'].str.join(', ')})
+                paged_table(results_df[['Matched In'] + list(filtered_df.columns)], key="search_results")
         else:
-            # Display regular search results
-            st.dataframe(
-                filtered_df,
-                use_container_width=True,
-                height=400
-            )
-    else:
-        st.warning("No matching results found")
+            st.warning("No matching results found")
+
+
+search_section()
 
 # st.write("### Dataset Overview")
 # st.write(f"Number of rows: {projects_df.shape[0]}")
@@ -185,124 +160,69 @@ with col6:
 
 
 # Load data from both sheets
-conn_funding = st.connection("gsheets_funding", type=GSheetsConnection)
-conn_admin = st.connection("gsheets_admin", type=GSheetsConnection)
-
-funding_df = conn_funding.read()
+funding_df = data.load_funding()
 # Clean column names
 funding_df.columns = funding_df.columns.str.strip()
-admin_df = conn_admin.read()
-
-# Slider for funding year range
-funding_year_range = st.slider(
-    "Select Funding Year Range",
-    min_value=2008,
-    max_value=2024,
-    value=(2015, 2024),
-    step=1,
-    key="funding_year_slider"
-)
-
-# Extract values
-# Dynamically compute research and admin earnings based on selected year range
-start_year, end_year = funding_year_range
-actual_cols = [f"{year} Actual" for year in range(start_year, end_year + 1) if f"{year} Actual" in funding_df.columns]
-# Define budget columns for research totals
-budget_cols = [f"{year} Budget" for year in range(start_year, end_year + 1) if f"{year} Budget" in funding_df.columns]
-# Clean and sum Research Total row
-research_row = funding_df[funding_df['Type'].astype(str).str.strip() == 'Research Total']
-if not research_row.empty:
-    research_values = research_row[budget_cols].applymap(lambda x: str(x).replace(',', '') if pd.notna(x) else '0')
-    research_values = research_values.apply(pd.to_numeric, errors='coerce')
-    berkeley_research_earnings = research_values.sum(axis=1).iloc[0]
-else:
-    berkeley_research_earnings = 0
-
-# Clean and sum Sub Award Total row
-subaward_row = funding_df[funding_df['Type'].astype(str).str.strip() == 'Sub Award Total']
-if not subaward_row.empty:
-    subaward_values = subaward_row[actual_cols].applymap(lambda x: str(x).replace(',', '') if pd.notna(x) else '0')
-    subaward_values = subaward_values.apply(pd.to_numeric, errors='coerce')
-    berkeley_subaward_earnings = subaward_values.sum(axis=1).iloc[0]
-else:
-    berkeley_subaward_earnings = 0
-
-# Create pie chart data
-ebi_distribution = pd.DataFrame({
-    'Category': ["Berkeley's Earnings Admin", "Berkeley's Earnings Research"],
-    'Amount': [berkeley_subaward_earnings, berkeley_research_earnings]
-})
-
-# Display total amounts
-st.header("Total EBI Contribution to Campus")
-col1, col2, col3 = st.columns(3)
-with col1:
-    st.metric("Research Funds", f"${berkeley_research_earnings:,.2f}")
-with col2:
-    st.metric("Outside Funds", f"${berkeley_subaward_earnings:,.2f}") 
-with col3:
-    total_funds = berkeley_research_earnings + berkeley_subaward_earnings
-    st.metric("Total Funds", f"${total_funds:,.2f}")
-
+admin_df = data.load_admin()
+
+@st.fragment
+def funding_totals_section():
+    # Slider for funding year range
+    funding_year_range = st.slider(
+        "Select Funding Year Range",
+        min_value=2008,
+        max_value=2024,
+        value=(2015, 2024),
+        step=1,
+        key="funding_year_slider"
+    )
 
-def load_finance_data():
-    # Load data from Google Sheets
-    conn_funding = st.connection("gsheets_funding", type=GSheetsConnection)
-    df = conn_funding.read()
-    
-    # Remove rows after the actual data (notes, totals, etc.)
-    df = df[df['Type'].notna()]  # Keep only rows with a valid Type
-    
-    # Fill NaN values with 0
-    df = df.fillna(0)
-    
-    # Convert string numbers to float for numeric columns
-    for col in df.columns:
-        if col not in ['Gift', 'Type', 'PI']:
-            try:
-                df[col] = df[col].astype(str).str.replace(',', '').astype(float)
-            except ValueError:
-                print(f"Warning: Could not convert column {col}")
-                df[col] = 0
-    
-    return df
+    # Extract values
+    # Dynamically compute research and admin earnings based on selected year range
+    # Range totals per funding Type come from the prefix-sum index, built once per refresh
+    analytics = tables.get("funding_analytics")
+    # Research Total row is summed over its budget columns
+    berkeley_research_earnings = analytics.totals('Type', funding_year_range, kind="Budget").get('Research Total', 0)
+    # Sub Award Total row is summed over its actual columns
+    berkeley_subaward_earnings = analytics.totals('Type', funding_year_range).get('Sub Award Total', 0)
+
+    # Display total amounts
+    st.header("Total EBI Contribution to Campus")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Research Funds", f"${berkeley_research_earnings:,.2f}")
+    with col2:
+        st.metric("Outside Funds", f"${berkeley_subaward_earnings:,.2f}") 
+    with col3:
+        total_funds = berkeley_research_earnings + berkeley_subaward_earnings
+        st.metric("Total Funds", f"${total_funds:,.2f}")
+
+
+funding_totals_section()
+
+def create_funding_type_chart(analytics):
+    # Total actual funding by type per year
+    yearly = analytics.totals(['Type', 'Year'], years=(2008, 2023)).unstack('Type', fill_value=0)
+    years = list(yearly.index)
 
-def create_funding_type_chart(df):
-    # Calculate total actual funding by type per year
-    research_total = []
-    subaward_total = []
-    years = range(2008, 2024)
-    
-    for year in years:
-        research_mask = df['Type'] == 'Research'
-        subaward_mask = df['Type'] == 'Sub-award'
-        
-        research_total.append(df[research_mask][f'{year} Actual'].sum())
-        subaward_total.append(df[subaward_mask][f'{year} Actual'].sum())
-    
     fig = go.Figure()
-    fig.add_trace(go.Bar(x=list(years), y=research_total, name='Research'))
-    fig.add_trace(go.Bar(x=list(years), y=subaward_total, name='Sub-award'))
-    
+    for funding_type in ['Research', 'Sub-award']:
+        y = yearly[funding_type] if funding_type in yearly.columns else [0] * len(years)
+        fig.add_trace(go.Bar(x=years, y=list(y), name=funding_type))
+
     fig.update_layout(
         title='Research vs Sub-award Funding by Year',
         barmode='stack',
         xaxis_title='Year',
         yaxis_title='Funding Amount ($)'
     )
-    
+
     return fig
 
-def create_top_pi_chart(df):
-    # Calculate total funding per PI
-    pi_totals = []
-    for _, row in df.iterrows():
-        total = sum(row[f'{year} Actual'] for year in range(2008, 2024))
-        pi_totals.append({'PI': row['PI'], 'Total': total})
-    
-    pi_df = pd.DataFrame(pi_totals)
-    top_10 = pi_df.nlargest(10, 'Total')
-    
+def create_top_pi_chart(analytics):
+    # Total funding per PI
+    top_10 = analytics.totals('PI', years=(2008, 2023)).nlargest(10).rename('Total').reset_index()
+
     fig = px.bar(top_10, 
                  x='PI', 
                  y='Total',
@@ -310,148 +230,70 @@ def create_top_pi_chart(df):
     
     return fig
 
-def analyze_program_funding(finance_df, productivity_df):
-    productivity_df['Last_Name'] = productivity_df['Principle Investigator'].str.split().str[-1]
-    
-    merged_df = pd.merge(
-        finance_df,
-        productivity_df[['Last_Name', 'Program', 'Discipline']],
-        left_on='PI',
-        right_on='Last_Name',
-        how='inner'
-    )
-    
-    # Calculate total funding by discipline
-    discipline_funding = []
-    # Get yearly funding by discipline
-    discipline_yearly_funding = {}
-    
-    for discipline in merged_df['Discipline'].unique():
-        discipline_data = merged_df[merged_df['Discipline'] == discipline]
-        total_funding = 0
-        yearly_totals = {}
-        
-        for year in range(2008, 2024):
-            actual_col = f'{year} Actual'
-            if actual_col in discipline_data.columns:
-                year_total = discipline_data[actual_col].sum()
-                total_funding += year_total
-                yearly_totals[year] = year_total
-        
-        discipline_funding.append({
-            'Discipline': discipline,
-            'Total_Funding': total_funding,
-            'Number_of_PIs': len(discipline_data['PI'].unique())
-        })
-        discipline_yearly_funding[discipline] = yearly_totals
-    
-    return pd.DataFrame(discipline_funding), merged_df, discipline_yearly_funding
-
-def analyze_institution_funding(finance_df, productivity_df):
-    # Merge finance and productivity data
-    productivity_df['Last_Name'] = productivity_df['Principle Investigator'].str.split().str[-1]
-    
-    merged_df = pd.merge(
-        finance_df,
-        productivity_df[['Last_Name', 'Institution', 'Sponsor']],
-        left_on='PI',
-        right_on='Last_Name',
-        how='inner'
-    )
-    
-    # Calculate total funding per institution for BP period (2008-2015)
-    bp_funding = {}
-    for institution in merged_df['Institution'].unique():
-        inst_data = merged_df[merged_df['Institution'] == institution]
-        total = 0
-        for year in range(2008, 2016):
-            actual_col = f'{year} Actual'
-            if actual_col in inst_data.columns:
-                total += inst_data[actual_col].sum()
-        bp_funding[institution] = total
-
-    # Calculate total funding per institution for Shell period (2016-2024)
-    shell_funding = {}
-    for institution in merged_df['Institution'].unique():
-        inst_data = merged_df[merged_df['Institution'] == institution]
-        total = 0
-        for year in range(2016, 2024):
-            actual_col = f'{year} Actual'
-            if actual_col in inst_data.columns:
-                total += inst_data[actual_col].sum()
-        shell_funding[institution] = total
-
-    return bp_funding, shell_funding
-
 # Create visualizations
 st.header("Program Funding Analysis")
 
 # Load and prepare data
-finance_df = load_finance_data()
-conn_dashboard = st.connection("gsheets_dashboard", type=GSheetsConnection)
-productivity_df = conn_dashboard.read()
+analytics, crosswalk = tables.get("funding_analytics", "crosswalk")
 
-# Get program funding data and merged dataframe
-program_funding_df, merged_df, yearly_funding = analyze_program_funding(finance_df, productivity_df)
-program_funding_df = program_funding_df.sort_values('Total_Funding', ascending=False)
+# Total funding and funded PIs per discipline, largest first
+program_funding_df = tables.get("program_funding")
 
 # Create time series data
-time_series_data = []
-for discipline, yearly_data in yearly_funding.items():
-    for year, amount in yearly_data.items():
-        time_series_data.append({
-            'Discipline': discipline,
-            'Year': year,
-            'Funding': amount
-        })
-
-time_series_df = pd.DataFrame(time_series_data)
-
-# Create time series chart
-time_series_year_range = st.slider(
-    "Select Year Range",
-    min_value=2008,
-    max_value=2024,
-    value=(2015, 2024),  # Default selection
-    step=1,
-    key="time_series_year_slider"  # Changed key
-)
+time_series_df = tables.get("time_series")
+
+@st.fragment
+def time_series_section():
+    # Create time series chart
+    time_series_year_range = st.slider(
+        "Select Year Range",
+        min_value=2008,
+        max_value=2024,
+        value=(2015, 2024),  # Default selection
+        step=1,
+        key="time_series_year_slider"  # Changed key
+    )
 
-chart_type = st.selectbox(
-    "Select chart type",
-    ["Bar", "Line", "Area", "Scatter", "Box Plot", "Violin"],
-    key="time_series_chart_type"
-)
+    chart_type = st.selectbox(
+        "Select chart type",
+        ["Bar", "Line", "Area", "Scatter", "Box Plot", "Violin"],
+        key="time_series_chart_type"
+    )
+
+    filtered_time_series = time_series_df[
+        (time_series_df['Year'] >= time_series_year_range[0]) & 
+        (time_series_df['Year'] <= time_series_year_range[1])
+    ]
+
+    # Create chart based on selection
+    if chart_type == "Line":
+        fig_time_series = px.line(filtered_time_series, x='Year', y='Funding', color='Discipline')
+    elif chart_type == "Bar":
+        fig_time_series = px.bar(filtered_time_series, x='Year', y='Funding', color='Discipline')
+    elif chart_type == "Area":
+        fig_time_series = px.area(filtered_time_series, x='Year', y='Funding', color='Discipline')
+    elif chart_type == "Scatter":
+        fig_time_series = px.scatter(filtered_time_series, x='Year', y='Funding', color='Discipline')
+    elif chart_type == "Box Plot":
+        fig_time_series = px.box(filtered_time_series, x='Year', y='Funding', color='Discipline')
+    elif chart_type == "Violin":
+        fig_time_series = px.violin(filtered_time_series, x='Year', y='Funding', color='Discipline')
+
+    fig_time_series.update_layout(
+        title='Funding by Program Over Time',
+        xaxis_title="Year",
+        yaxis_title="Funding ($)",
+        yaxis_tickformat='$,.0f'
+    )
+
+    st.plotly_chart(fig_time_series, use_container_width=True)
 
-filtered_time_series = time_series_df[
-    (time_series_df['Year'] >= time_series_year_range[0]) & 
-    (time_series_df['Year'] <= time_series_year_range[1])
-]
-
-# Create chart based on selection
-if chart_type == "Line":
-    fig_time_series = px.line(filtered_time_series, x='Year', y='Funding', color='Discipline')
-elif chart_type == "Bar":
-    fig_time_series = px.bar(filtered_time_series, x='Year', y='Funding', color='Discipline')
-elif chart_type == "Area":
-    fig_time_series = px.area(filtered_time_series, x='Year', y='Funding', color='Discipline')
-elif chart_type == "Scatter":
-    fig_time_series = px.scatter(filtered_time_series, x='Year', y='Funding', color='Discipline')
-elif chart_type == "Box Plot":
-    fig_time_series = px.box(filtered_time_series, x='Year', y='Funding', color='Discipline')
-elif chart_type == "Violin":
-    fig_time_series = px.violin(filtered_time_series, x='Year', y='Funding', color='Discipline')
-
-fig_time_series.update_layout(
-    title='Funding by Program Over Time',
-    xaxis_title="Year",
-    yaxis_title="Funding ($)",
-    yaxis_tickformat='$,.0f'
-)
 
-st.plotly_chart(fig_time_series, use_container_width=True)
+time_series_section()
 
-bp_dist, shell_dist = analyze_institution_funding(finance_df, productivity_df)
+institution_funding = tables.get("institution_funding")
+bp_dist = institution_funding['BP'].to_dict()
+shell_dist = institution_funding['Shell'].to_dict()
 
 
 # Calculate combined funding
@@ -519,83 +361,87 @@ with col2:
 
 
 # Now show the program details
-st.subheader("Program Details")
-year_range = st.slider(
-    "Select Year Range",
-    min_value=2008,
-    max_value=2024,
-    value=(2015, 2024),  # Default selection
-    step=1,
-    key="program_details_year_slider"
-)
+@st.cache_data(max_entries=256, show_spinner=False)
+def program_details(program, year_range, version):
+    """
+    Metrics and chart data for one program, computed once per
+    (program, year range) and data version.
+    """
+    analytics, crosswalk, deliverables_df = tables.get("funding_analytics", "crosswalk", "deliverables")
+
+    # Funding per PI and type for this program within the slider range
+    pi_df = analytics.program_pis(program, year_range)
+    if pi_df.empty:
+        return None
+
+    # Institution totals, with each PI's institution from the crosswalk
+    pi_institutions = pi_df['PI'].astype(object).map(crosswalk.institution_of).fillna('Unknown')
+
+    # Deliverables of the program's projects, parsed once per refresh
+    program_deliverables = deliverables_df[deliverables_df['Program'] == program]
+
+    return {
+        'pi_df': pi_df,
+        'total': pi_df['Total_Funding'].sum(),
+        'research_total': pi_df[pi_df['Type'] == 'Research']['Total_Funding'].sum(),
+        'subaward_total': pi_df[pi_df['Type'] == 'Sub-award']['Total_Funding'].sum(),
+        'num_pis': pi_df['PI'].nunique(),
+        'type_totals': pi_df.groupby('Type', observed=True)['Total_Funding'].sum(),
+        'institution_totals': pi_df.groupby(pi_institutions)['Total_Funding'].sum(),
+        'deliverable_counts': deliverables.totals(program_deliverables),
+        'pi_deliverables': deliverables.totals(program_deliverables, 'Principle Investigator'),
+    }
 
-for program in merged_df['Program'].unique():
-    # Skip if program is nan
-    if pd.isna(program):
-        continue
-        
-    program_data = merged_df[merged_df['Program'] == program]
-    
-    # Use slider range values
-    year_range = range(year_range[0], year_range[1] + 1)
-    
-    total_funding = sum(
-        program_data[f'{year} Actual'].sum() 
-        for year in year_range 
-        if f'{year} Actual' in program_data.columns
+
+@st.fragment
+def program_details_section():
+    st.subheader("Program Details")
+    year_range = st.slider(
+        "Select Year Range",
+        min_value=2008,
+        max_value=2024,
+        value=(2015, 2024),  # Default selection
+        step=1,
+        key="program_details_year_slider"
     )
-    
-    with st.expander(f"{program}"):
-        # Get PIs and their funding for this program
-        program_pis = merged_df[merged_df['Program'] == program]
-        pi_funding = []
-        
-        for pi in program_pis['PI'].unique():
-            pi_data = program_pis[program_pis['PI'] == pi]
-            total = 0
-            for year in year_range:  # Use slider range
-                actual_col = f'{year} Actual'
-                if actual_col in pi_data.columns:
-                    total += float(pi_data[actual_col].iloc[0]) if pd.notna(pi_data[actual_col].iloc[0]) else 0
-            
-            pi_funding.append({
-                'PI': pi,
-                'Type': pi_data['Type'].iloc[0],
-                'Total_Funding': total,
-                'Discipline': pi_data['Discipline'].iloc[0]
-            })
-        
-        if pi_funding:
-            pi_df = pd.DataFrame(pi_funding)
-            pi_df = pi_df.sort_values('Total_Funding', ascending=False)
-            
-            # Calculate total from DataFrame
-            total_from_df = pi_df['Total_Funding'].sum()
-            
-            # Calculate Research and Sub-award totals from the DataFrame
-            research_total = pi_df[pi_df['Type'] == 'Research']['Total_Funding'].sum()
-            subaward_total = pi_df[pi_df['Type'] == 'Sub-award']['Total_Funding'].sum()
-            
+
+    # Only the selected program is computed and sent to the browser
+    program = st.selectbox(
+        "Select a program",
+        analytics.programs(),
+        index=None,
+        placeholder="Choose a program to see its details",
+        key="program_details_program"
+    )
+
+    if program is not None:
+        details = program_details(
+            program, year_range, tables.graph.version("funding_analytics", "crosswalk", "deliverables")
+        )
+
+        if details is not None:
+            pi_df = details['pi_df']
+
             # Display program metrics
             col1, col2, col3, col4, col5 = st.columns(5)
             with col1:
-                st.metric("Total Funding", f"${total_from_df:,.2f}")
+                st.metric("Total Funding", f"${details['total']:,.2f}")
             with col2:
-                st.metric("Research Funding", f"${research_total:,.2f}")
+                st.metric("Research Funding", f"${details['research_total']:,.2f}")
             with col3:
-                st.metric("Sub-award Funding", f"${subaward_total:,.2f}")
+                st.metric("Sub-award Funding", f"${details['subaward_total']:,.2f}")
             with col4:
-                st.metric("Number of PIs", len(pi_df))
+                st.metric("Number of PIs", details['num_pis'])
             with col5:
-                avg_funding = total_from_df / len(pi_df)
+                avg_funding = details['total'] / details['num_pis']
                 st.metric("Average per PI", f"${avg_funding:,.2f}")
-            
+
             # Create 3 columns for charts
             col1, col2, col3 = st.columns(3)
-            
+
             with col1:
                 # Program funding chart
-                program_funding = pi_df.groupby('Type')['Total_Funding'].sum()
+                program_funding = details['type_totals']
                 fig1 = px.pie(
                     values=program_funding.values,
                     names=program_funding.index,
@@ -606,63 +452,21 @@ for program in merged_df['Program'].unique():
 
             with col2:
                 # Institution funding chart
-                institution_totals = {}
-                for _, row in pi_df.iterrows():
-                    # Get institution from productivity_df using PI's last name
-                    pi_inst = productivity_df[productivity_df['Last_Name'] == row['PI']]['Institution'].iloc[0] \
-                        if not productivity_df[productivity_df['Last_Name'] == row['PI']].empty else 'Unknown'
-                    
-                    # Add funding to institution total
-                    institution_totals[pi_inst] = institution_totals.get(pi_inst, 0) + row['Total_Funding']
-                
+                institution_totals = details['institution_totals']
                 fig2 = px.pie(
-                    values=list(institution_totals.values()),
-                    names=list(institution_totals.keys()),
+                    values=institution_totals.values,
+                    names=institution_totals.index,
                     title='Funding by Institution'
                 )
                 fig2.update_traces(textinfo='percent+label')
                 st.plotly_chart(fig2, use_container_width=True, key=f"{program}_inst_dist")
 
             with col3:
-                # Deliverables chart (existing code)
-                program_deliverables = productivity_df[productivity_df['Program'] == program]['Productivity and Deliverables'].dropna()
-                
-                # Initialize counters
-                deliverable_counts = {
-                    'Publications': 0,
-                    'Presentations': 0,
-                    'Reports': 0,
-                    'Other': 0
-                }
-
-                # Process each deliverable entry
-                for entry in program_deliverables:
-                    entry = str(entry).lower()
-                    # Count publications
-                    if any(keyword in entry for keyword in ['publication', 'paper', 'journal', 'article']):
-                        # Try to extract number if format is like "5 publications"
-                        import re
-                        nums = re.findall(r'(\d+)\s*(?:publication|paper|article)', entry)
-                        deliverable_counts['Publications'] += sum([int(n) for n in nums]) if nums else 1
-                    
-                    # Count presentations
-                    if any(keyword in entry for keyword in ['presentation', 'conference', 'workshop']):
-                        nums = re.findall(r'(\d+)\s*(?:presentation|conference|workshop)', entry)
-                        deliverable_counts['Presentations'] += sum([int(n) for n in nums]) if nums else 1
-                    
-                    # Count reports
-                    if 'report' in entry:
-                        nums = re.findall(r'(\d+)\s*report', entry)
-                        deliverable_counts['Reports'] += sum([int(n) for n in nums]) if nums else 1
-                    
-                    # Count other deliverables
-                    if any(keyword in entry for keyword in ['dataset', 'software', 'tool', 'patent']):
-                        deliverable_counts['Other'] += 1
-
-                # Create deliverables chart
+                # Deliverables chart
+                deliverable_counts = details['deliverable_counts']
                 fig_deliverables = px.bar(
-                    x=list(deliverable_counts.keys()),
-                    y=list(deliverable_counts.values()),
+                    x=deliverable_counts.index,
+                    y=deliverable_counts.values,
                     title='Program Deliverables',
                     labels={'x': 'Type', 'y': 'Count'}
                 )
@@ -676,11 +480,25 @@ for program in merged_df['Program'].unique():
                 }),
                 use_container_width=True
             )
+
+            # Deliverables per PI of the program
+            pi_deliverables = details['pi_deliverables']
+            if pi_deliverables.to_numpy().sum():
+                fig_pi_deliverables = px.bar(
+                    pi_deliverables.reset_index().melt(
+                        id_vars='Principle Investigator', var_name='Type', value_name='Count'
+                    ),
+                    x='Principle Investigator',
+                    y='Count',
+                    color='Type',
+                    title='Deliverables by PI'
+                )
+                st.plotly_chart(fig_pi_deliverables, use_container_width=True, key=f"{program}_pi_deliverables")
         else:
             st.write("No PI data available for this program")
 
 
-
+program_details_section()
 
 # Debug section to show raw dataframes
 st.markdown("---")
@@ -688,13 +506,14 @@ st.header("Debug: Raw Data")
 
 with st.expander("Dashboard Data"):
     st.write("### Projects Dashboard Data")
-    st.dataframe(projects_df, use_container_width=True)
+    paged_table(projects_df, key="debug_projects")
     st.write(f"Total rows in dashboard: {len(projects_df)}")
     st.write("Columns:", projects_df.columns.tolist())
 
 with st.expander("Funding Data"):
+    actual_cols = [col for col in funding_df.columns if col.endswith(" Actual")]
     st.write("### Funding Data")
-    st.dataframe(funding_df, use_container_width=True)
+    paged_table(funding_df, key="debug_funding")
     st.write(f"Total rows in funding: {len(funding_df)}")
     st.write("Columns:", funding_df.columns.tolist())
     st.write("Actual Columns Used:", actual_cols)
@@ -704,4 +523,18 @@ with st.expander("Funding Data"):
     st.write(funding_df[funding_df['Type'].astype(str).str.strip() == 'Research Total'][actual_cols])
     
     st.write("Sub-award Row (raw):")
-    st.write(funding_df[funding_df['Type'].astype(str).str.strip() == 'Sub Award Total'][actual_cols])
\ No newline at end of file
+    st.write(funding_df[funding_df['Type'].astype(str).str.strip() == 'Sub Award Total'][actual_cols])
+
+with st.expander("PI Name Matches"):
+    st.write("### Spellings merged into a canonical PI name")
+    name_matches = tables.get("pi_name_matches")
+    name_matches = name_matches[name_matches['canonical'] != name_matches.index]
+    paged_table(name_matches.sort_values('confidence').reset_index(), key="debug_name_matches")
+    st.write("Add rows to pi_overrides.csv to correct a match.")
+
+with st.expander("Funding PI Crosswalk"):
+    st.write("### Funding PIs not linked to exactly one person")
+    pi_matches = crosswalk.match(funding_df['PI'])
+    paged_table(pi_matches[pi_matches['Status'] != 'matched'], key="debug_crosswalk")
+    st.write("Ambiguous last names are left out of program, discipline and institution totals. "
+             "Map them to a full name in pi_overrides.csv to include them.")
@@ -0,0 +1,153 @@
+"""
+Distinct-patent counts for the IP page.
+
+The IP sheet has one row per patent filing, and a patent can appear on several
+rows (one per PI, say). Every chart on the IP page counts distinct patent
+titles by one dimension, optionally within one value of another. The cube
+computes all of those counts once per data refresh, so the page only does
+lookups. When the page is cross-filtered, counts come from per-value row
+bitsets instead.
+"""
+from itertools import permutations
+
+import numpy as np
+import pandas as pd
+
+TITLE = "Patent Title"
+
+# Dimensions the IP page groups or filters by
+DIMENSIONS = [
+    "PI", "Institution", "Filing Type", "Lead Inv Dept", "Lead Sponsor",
+    "Program", "Sponsor", "Application_YR",
+]
+
+
+class PatentCube:
+    """
+    Distinct patent counts per dimension and per pair of dimensions.
+    """
+
+    def __init__(self, patents_df, dimensions=DIMENSIONS):
+        self.dimensions = [dim for dim in dimensions if dim in patents_df.columns]
+        self.total = patents_df[TITLE].nunique()
+        # Number of distinct values of each dimension (e.g. distinct PIs)
+        self.distinct = {dim: patents_df[dim].nunique() for dim in self.dimensions}
+        # dim -> distinct patents per value
+        self.counts = {
+            dim: patents_df.groupby(dim, observed=True)[TITLE].nunique()
+            for dim in self.dimensions
+        }
+        # (dim, within) -> distinct patents per (within value, dim value)
+        self.cross = {
+            (dim, within): patents_df.groupby([within, dim], observed=True)[TITLE].nunique()
+            for dim, within in permutations(self.dimensions, 2)
+        }
+
+    def by(self, dim, within=None):
+        """
+        Distinct patents per value of dim, as a Series named after the title
+        column. `within` is an optional (dimension, value) pair to count
+        only the patents with that value.
+        """
+        if within is None:
+            return self.counts[dim]
+        other, value = within
+        cross = self.cross[(dim, other)]
+        if value not in cross.index.get_level_values(0):
+            return cross.iloc[:0].droplevel(0)
+        return cross.xs(value, level=0)
+
+    def count(self, dim=None, value=None):
+        """
+        Distinct patents overall, or with the given value of dim.
+        """
+        if dim is None:
+            return self.total
+        return int(self.counts[dim].get(value, 0))
+
+    def share(self, dim, within=None):
+        """
+        Percentage of the counted patents per value of dim.
+        """
+        counts = self.by(dim, within)
+        total = counts.sum()
+        return counts / total * 100 if total else counts.astype(float)
+
+
+class PatentBitmaps:
+    """
+    Row bitsets per dimension value, for distinct-patent counts under any
+    combination of filters.
+
+    Filters map a dimension to the values selected in it. Rows pass when they
+    match one of the selected values of every filtered dimension, so a filter
+    is an OR of value bitsets within a dimension and an AND across
+    dimensions, done on packed bits. Counting then only touches the rows that
+    pass.
+    """
+
+    def __init__(self, patents_df, dimensions=DIMENSIONS):
+        self.dimensions = [dim for dim in dimensions if dim in patents_df.columns]
+        self.size = len(patents_df)
+        # Patent title code per row (-1 when missing)
+        self.titles, title_values = pd.factorize(patents_df[TITLE])
+        self.title_count = len(title_values)
+        self.all_rows = np.packbits(np.ones(self.size, dtype=bool))
+        # dim -> value code per row, the values in code order, and value -> packed bitset
+        self.codes = {}
+        self.values = {}
+        self.bitmaps = {}
+        for dim in self.dimensions:
+            codes, values = pd.factorize(patents_df[dim], sort=True)
+            self.codes[dim] = codes
+            self.values[dim] = pd.Index(np.asarray(values), name=dim)
+            order = np.argsort(codes, kind="stable")
+            bounds = np.searchsorted(codes[order], np.arange(len(values) + 1))
+            self.bitmaps[dim] = {}
+            for code, value in enumerate(self.values[dim]):
+                bits = np.zeros(self.size, dtype=bool)
+                bits[order[bounds[code]:bounds[code + 1]]] = True
+                self.bitmaps[dim][value] = np.packbits(bits)
+
+    def mask(self, filters, exclude=None):
+        """
+        Packed bitset of the rows passing every filter except the one on `exclude`.
+        """
+        mask = self.all_rows.copy()
+        for dim, selected in filters.items():
+            if dim == exclude or not selected:
+                continue
+            matched = np.zeros_like(mask)
+            for value in selected:
+                bits = self.bitmaps[dim].get(value)
+                if bits is not None:
+                    np.bitwise_or(matched, bits, out=matched)
+            np.bitwise_and(mask, matched, out=mask)
+        return mask
+
+    def rows(self, mask):
+        """
+        Boolean row mask from a packed bitset.
+        """
+        return np.unpackbits(mask, count=self.size).view(bool)
+
+    def count(self, filters):
+        """
+        Distinct patents in the rows passing every filter.
+        """
+        titles = self.titles[self.rows(self.mask(filters))]
+        return int(np.count_nonzero(np.bincount(titles[titles >= 0], minlength=self.title_count)))
+
+    def by(self, dim, filters, cross=True):
+        """
+        Distinct patents per value of dim in the rows passing the filters, as
+        a Series like PatentCube.by. With `cross`, dim's own filter is
+        ignored, so a chart keeps showing the values it can still add.
+        """
+        rows = self.rows(self.mask(filters, exclude=dim if cross else None))
+        codes = self.codes[dim][rows]
+        titles = self.titles[rows]
+        present = (codes >= 0) & (titles >= 0)
+        pairs = np.unique(codes[present].astype(np.int64) * self.title_count + titles[present])
+        counts = np.bincount(pairs // max(self.title_count, 1), minlength=len(self.values[dim]))
+        return pd.Series(counts, index=self.values[dim], name=TITLE)[counts > 0]
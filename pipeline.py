@@ -0,0 +1,152 @@
+"""
+A small dependency graph of derived tables.
+
+Each table is a named, pure function of other tables. Source tables wrap the
+loaders in data.py and are identified by a hash of their content, computed
+once per data version when the loader can tell one; a derived
+table is only rebuilt when the content of something upstream of it has
+changed since it was last built. Results are shared by every page and
+session in the process, so treat them as read-only.
+"""
+import hashlib
+import threading
+from collections import defaultdict
+
+import pandas as pd
+
+
+def fingerprint(value):
+    """
+    Return a content hash for a DataFrame, Series or plain value.
+    """
+    digest = hashlib.sha1()
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        digest.update(pd.util.hash_pandas_object(value, index=True).values.tobytes())
+        if isinstance(value, pd.DataFrame):
+            digest.update(repr(list(value.columns)).encode())
+            digest.update(repr(list(value.dtypes.astype(str))).encode())
+    else:
+        digest.update(repr(value).encode())
+    return digest.hexdigest()
+
+
+class Node:
+    def __init__(self, name, func, inputs=(), source=False, version=None):
+        self.name = name
+        self.func = func
+        self.inputs = tuple(inputs)
+        self.source = source
+        self.version = version
+
+
+class Graph:
+    """
+    Registry of source and derived tables with content-hash memoization.
+    """
+
+    def __init__(self):
+        self.nodes = {}
+        # Table name -> (key of its inputs, built value)
+        self._memo = {}
+        # Source name -> (data version, content hash)
+        self._source_keys = {}
+        self._locks = defaultdict(threading.Lock)
+        # Number of times each derived table has been (re)built
+        self.builds = defaultdict(int)
+
+    def source(self, name, loader, version=None):
+        """
+        Register a source table read by calling loader().
+
+        `version(value)` may return a token that changes whenever the loaded
+        content does (None if unknown). The content hash is then computed once
+        per token rather than on every read.
+        """
+        self.nodes[name] = Node(name, loader, source=True, version=version)
+
+    def table(self, name, inputs):
+        """
+        Decorator registering a derived table built from the named inputs.
+
+        The decorated function is called with the input tables as positional
+        arguments, in the order given, and is returned unchanged.
+        """
+        def register(func):
+            missing = [i for i in inputs if i not in self.nodes]
+            if missing:
+                raise KeyError(f"Table '{name}' depends on unknown tables {missing}")
+            self.nodes[name] = Node(name, func, inputs)
+            return func
+        return register
+
+    def get(self, *names):
+        """
+        Return one table, or a tuple of tables when several names are given.
+
+        Sources shared by the requested tables are only loaded once per call.
+        """
+        resolved = {}
+        values = [self._resolve(name, resolved)[0] for name in names]
+        return values[0] if len(values) == 1 else tuple(values)
+
+    def version(self, *names):
+        """
+        Content key of the given tables; it changes whenever any of them would
+        be rebuilt. Useful as a cache key for work derived from the tables.
+        """
+        resolved = {}
+        return fingerprint(tuple(self._resolve(name, resolved)[1] for name in names))
+
+    def upstream(self, name):
+        """
+        Return the names of all tables the given table depends on.
+        """
+        found = set()
+        stack = list(self.nodes[name].inputs)
+        while stack:
+            current = stack.pop()
+            if current not in found:
+                found.add(current)
+                stack.extend(self.nodes[current].inputs)
+        return found
+
+    def invalidate(self, name=None):
+        """
+        Forget the built value of one table (or of every table).
+        """
+        if name is None:
+            self._memo.clear()
+            self._source_keys.clear()
+        else:
+            self._memo.pop(name, None)
+            self._source_keys.pop(name, None)
+
+    def _resolve(self, name, resolved):
+        if name in resolved:
+            return resolved[name]
+
+        node = self.nodes[name]
+        if node.source:
+            value = node.func()
+            token = node.version(value) if node.version else None
+            cached = self._source_keys.get(name)
+            if token is not None and cached is not None and cached[0] == token:
+                key = cached[1]
+            else:
+                key = fingerprint(value)
+                if token is not None:
+                    self._source_keys[name] = (token, key)
+        else:
+            inputs = [self._resolve(i, resolved) for i in node.inputs]
+            key = fingerprint((name, tuple(k for _, k in inputs)))
+            with self._locks[name]:
+                memo = self._memo.get(name)
+                if memo is not None and memo[0] == key:
+                    value = memo[1]
+                else:
+                    value = node.func(*(v for v, _ in inputs))
+                    self._memo[name] = (key, value)
+                    self.builds[name] += 1
+
+        resolved[name] = (value, key)
+        return resolved[name]
@@ -0,0 +1,194 @@
+"""
+Portfolio rollups for the Entrepreneurship page.
+
+Companies are grouped once per refresh into cells, one per (industry,
+founding year, financing stage), with the rows of each cell stored
+contiguously. Filtering by industry and founding year then selects cells
+rather than scanning companies. Counts and sums are bincounts over the
+selected cells, medians are read off rows presorted by value, and the top
+companies come from a short list of per-cell leaders.
+"""
+import numpy as np
+import pandas as pd
+
+INDUSTRY = "Primary Industry Code"
+FOUNDED = "Year Founded"
+STAGE = "Last Financing Deal Type"
+
+DIMENSIONS = [INDUSTRY, FOUNDED, STAGE]
+MEASURES = ["Total Raised", "Employees"]
+
+# Companies kept per cell and returned by Portfolio.top
+TOP_K = 10
+
+
+class Portfolio:
+    """
+    Counts, sums, medians and top companies of the EBI² portfolio by
+    industry, founding-year cohort and financing stage, under any industry
+    and founding-year filter.
+    """
+
+    def __init__(self, ebi2_df, top_k=TOP_K):
+        self.top_k = top_k
+        self.size = len(ebi2_df)
+
+        # dim -> code per row (-1 when missing) and the values in code order
+        codes = {}
+        self.values = {}
+        for dim in DIMENSIONS:
+            column = ebi2_df[dim] if dim in ebi2_df.columns else pd.Series(np.nan, index=ebi2_df.index)
+            codes[dim], values = pd.factorize(column, sort=True)
+            self.values[dim] = pd.Index(np.asarray(values), name=dim)
+
+        # One cell per observed combination of values; rows are stored cell by cell
+        key = np.zeros(self.size, dtype=np.int64)
+        for dim in DIMENSIONS:
+            key = key * (len(self.values[dim]) + 1) + codes[dim] + 1
+        _, cell_of_row = np.unique(key, return_inverse=True)
+        order = np.argsort(cell_of_row, kind="stable")
+        self.index = ebi2_df.index[order]
+        self.cell_sizes = np.bincount(cell_of_row)
+        self.cell_of_row = cell_of_row[order]
+        cell_count = len(self.cell_sizes)
+        first_row = np.cumsum(self.cell_sizes) - self.cell_sizes
+
+        self.codes = {dim: codes[dim][order] for dim in DIMENSIONS}
+        self.cell_codes = {dim: self.codes[dim][first_row] for dim in DIMENSIONS}
+        # Code -1 (no founding year, or no years at all) picks the trailing NaN
+        years = np.append(self.values[FOUNDED].to_numpy(dtype=float), np.nan)
+        self.cell_years = years[self.cell_codes[FOUNDED]]
+
+        self.companies = ebi2_df["Company"].to_numpy()[order]
+        self.measures = {
+            measure: ebi2_df[measure].to_numpy(dtype=float, na_value=np.nan)[order] for measure in MEASURES
+        }
+        self.cell_sums = {
+            measure: np.bincount(self.cell_of_row, weights=np.nan_to_num(values), minlength=cell_count)
+            for measure, values in self.measures.items()
+        }
+
+        # (dim, measure) -> rows with both, sorted by dim code then value, for medians
+        self._median_rows = {}
+        for dim in DIMENSIONS:
+            for measure, values in self.measures.items():
+                valid = np.flatnonzero((self.codes[dim] >= 0) & ~np.isnan(values))
+                self._median_rows[(dim, measure)] = valid[np.lexsort((values[valid], self.codes[dim][valid]))]
+
+        # measure -> the top_k rows of every cell, largest first across all cells
+        self._leaders = {}
+        for measure, values in self.measures.items():
+            valid = np.flatnonzero(~np.isnan(values))
+            ranked = valid[np.lexsort((-values[valid], self.cell_of_row[valid]))]
+            cells = self.cell_of_row[ranked]
+            rank = np.arange(len(ranked)) - np.searchsorted(cells, cells)
+            leaders = ranked[rank < top_k]
+            self._leaders[measure] = leaders[np.argsort(-values[leaders], kind="stable")]
+
+        # Unfiltered rollups, materialized up front
+        self._rollups = {dim: self._rollup(dim, np.ones(cell_count, dtype=bool)) for dim in DIMENSIONS}
+
+    @property
+    def industries(self):
+        return self.values[INDUSTRY].tolist()
+
+    @property
+    def founded_range(self):
+        """
+        (first, last) founding year in the portfolio.
+        """
+        years = self.values[FOUNDED]
+        return (int(years.min()), int(years.max())) if len(years) else (None, None)
+
+    def select(self, industries=None, years=None):
+        """
+        Boolean mask of the cells in the given industries and founded within
+        the inclusive (start, end) years; None for no filter.
+        """
+        if not industries and years is None:
+            return None
+        selected = np.ones(len(self.cell_sizes), dtype=bool)
+        if industries:
+            wanted = self.values[INDUSTRY].get_indexer(list(industries))
+            selected &= np.isin(self.cell_codes[INDUSTRY], wanted[wanted >= 0])
+        if years is not None:
+            start, end = years
+            selected &= (self.cell_years >= start) & (self.cell_years <= end)
+        return selected
+
+    def _row_mask(self, selected):
+        return np.repeat(selected, self.cell_sizes)
+
+    def totals(self, selected=None):
+        """
+        Companies, summed measures and the first founding year of the selected cells.
+        """
+        if selected is None:
+            selected = np.ones(len(self.cell_sizes), dtype=bool)
+        years = self.cell_years[selected & (self.cell_sizes > 0)]
+        years = years[~np.isnan(years)]
+        totals = {"Companies": int(self.cell_sizes[selected].sum())}
+        totals.update({measure: self.cell_sums[measure][selected].sum() for measure in MEASURES})
+        totals["First Founded"] = int(years.min()) if len(years) else None
+        return totals
+
+    def rollup(self, dim, selected=None):
+        """
+        Companies, sums and medians of the measures per value of dim, for
+        the selected cells (values without companies are left out).
+        """
+        if selected is None:
+            return self._rollups[dim]
+        return self._rollup(dim, selected)
+
+    def _rollup(self, dim, selected):
+        values = self.values[dim]
+        codes = self.cell_codes[dim][selected]
+        present = codes >= 0
+        columns = {"Companies": np.bincount(codes[present], weights=self.cell_sizes[selected][present],
+                                            minlength=len(values)).astype(int)}
+        for measure in MEASURES:
+            columns[measure] = np.bincount(codes[present], weights=self.cell_sums[measure][selected][present],
+                                           minlength=len(values))
+        rows = self._row_mask(selected)
+        for measure in MEASURES:
+            columns[f"Median {measure}"] = self._medians(dim, measure, rows)
+        keep = columns["Companies"] > 0
+        return pd.DataFrame({name: column[keep] for name, column in columns.items()}, index=values[keep])
+
+    def _medians(self, dim, measure, rows):
+        ordered = self._median_rows[(dim, measure)]
+        ordered = ordered[rows[ordered]]
+        codes = self.codes[dim][ordered]
+        values = self.measures[measure][ordered]
+        counts = np.bincount(codes, minlength=len(self.values[dim]))
+        if not len(values):
+            return np.full(len(counts), np.nan)
+        starts = np.cumsum(counts) - counts
+        # Middle one or two values of each group's sorted run (clipped for empty groups)
+        lower = np.minimum(starts + (counts - 1) // 2, len(values) - 1)
+        upper = np.minimum(starts + counts // 2, len(values) - 1)
+        return np.where(counts > 0, (values[lower] + values[upper]) / 2, np.nan)
+
+    def top(self, measure, selected=None, k=None):
+        """
+        The k companies (k <= top_k) with the largest measure in the selected
+        cells, largest first, indexed like the sheet.
+        """
+        k = min(k or self.top_k, self.top_k)
+        leaders = self._leaders[measure]
+        if selected is not None:
+            leaders = leaders[selected[self.cell_of_row[leaders]]]
+        leaders = leaders[:k]
+        return pd.DataFrame(
+            {"Company": self.companies[leaders], measure: self.measures[measure][leaders]},
+            index=self.index[leaders],
+        )
+
+    def rows(self, selected=None):
+        """
+        Sheet index labels of the companies in the selected cells.
+        """
+        if selected is None:
+            return self.index
+        return self.index[self._row_mask(selected)]
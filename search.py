@@ -0,0 +1,133 @@
+"""
+Full-text search over the projects sheet.
+
+The index is built once per data refresh. Every searchable cell is lowercased
+and indexed by its character trigrams (for substring queries) and by its word
+tokens (to rank whole-word hits above partial ones). A query only looks at
+the rows that contain all of its trigrams and then confirms the substring in
+those cells, so query time depends on the number of candidate cells rather
+than on the total amount of text.
+"""
+import re
+
+import pandas as pd
+
+# Searchable columns and their weight in the relevance score
+SEARCH_COLUMNS = {
+    "Principle Investigator": 5,
+    "Project Name": 4,
+    "Program": 3,
+    "Discipline": 3,
+    "Institution": 3,
+    "Personnel": 2,
+    "Sponsor": 2,
+    "Productivity and Deliverables": 1,
+}
+
+# Columns searched for each choice of the page's "Filter by" selector
+FIELDS = {
+    "All": list(SEARCH_COLUMNS),
+    "PI": ["Principle Investigator"],
+    "Institution": ["Institution"],
+    "Program": ["Program"],
+    "Discipline": ["Discipline"],
+}
+
+# A whole-word hit scores this many times a partial one
+WORD_BONUS = 2
+
+_TOKEN = re.compile(r"\w+")
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class SearchIndex:
+    """
+    Trigram and token inverted index over the searchable columns of a DataFrame.
+    """
+
+    def __init__(self, df, columns=SEARCH_COLUMNS):
+        self.columns = [col for col in columns if col in df.columns]
+        self.ids = df.index
+        # column -> lowercased text per row position (None for missing cells)
+        self.texts = {}
+        # trigram -> {column: set of row positions}
+        self._trigrams = {}
+        # token -> {column: set of row positions}
+        self._tokens = {}
+        for col in self.columns:
+            values = df[col].astype(object)
+            texts = [None if pd.isna(value) else str(value).lower() for value in values]
+            self.texts[col] = texts
+            for row, text in enumerate(texts):
+                if not text:
+                    continue
+                for gram in trigrams(text):
+                    self._trigrams.setdefault(gram, {}).setdefault(col, set()).add(row)
+                for token in _TOKEN.findall(text):
+                    self._tokens.setdefault(token, {}).setdefault(col, set()).add(row)
+
+    def _candidates(self, query, col):
+        # Rows of one column whose text could contain the query
+        grams = trigrams(query)
+        if not grams:
+            # Too short for trigrams: check every non-missing cell
+            return [row for row, text in enumerate(self.texts[col]) if text]
+        postings = []
+        for gram in grams:
+            rows = self._trigrams.get(gram, {}).get(col)
+            if not rows:
+                return []
+            postings.append(rows)
+        postings.sort(key=len)
+        return postings[0].intersection(*postings[1:])
+
+    def search(self, query, fields=None):
+        """
+        Rows whose searched fields contain the query (case-insensitive).
+
+        Returns a DataFrame indexed by row id with the relevance Score and the
+        list of Fields that matched, best matches first.
+        """
+        query = query.strip().lower()
+        fields = [col for col in (fields or self.columns) if col in self.texts]
+        if not query:
+            return pd.DataFrame(columns=["Score", "Fields"])
+
+        query_tokens = _TOKEN.findall(query)
+        scores = {}
+        hits = {}
+        for col in fields:
+            texts = self.texts[col]
+            # Rows where every query word is a whole word of the cell
+            whole = None
+            for token in query_tokens:
+                rows = self._tokens.get(token, {}).get(col, set())
+                whole = rows if whole is None else whole & rows
+            whole = whole or set()
+            for row in self._candidates(query, col):
+                if query not in texts[row]:
+                    continue
+                weight = SEARCH_COLUMNS.get(col, 1)
+                scores[row] = scores.get(row, 0) + weight * (WORD_BONUS if row in whole else 1)
+                hits.setdefault(row, []).append(col)
+
+        # Highest score first; ties keep the sheet order
+        rows = sorted(scores, key=lambda row: (-scores[row], row))
+        return pd.DataFrame(
+            {"Score": [scores[row] for row in rows], "Fields": [hits[row] for row in rows]},
+            index=self.ids[rows],
+        )
+
+
+def highlight(text, query):
+    """
+    Markdown of text with every case-insensitive occurrence of query in bold.
+    """
+    text = str(text)
+    query = query.strip()
+    if not query:
+        return text
+    return re.sub(re.escape(query), lambda m: f"**{m.group(0)}**", text, flags=re.IGNORECASE)
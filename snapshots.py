@@ -0,0 +1,120 @@
+"""
+Local Parquet snapshots of the Google Sheets datasets.
+
+Each dataset is stored as versioned files under ``<root>/<dataset>/``, named
+by the UTC time they were taken, so the app can boot from the latest local
+copy while the sheet is refreshed in the background. A flat
+``<root>/<dataset>.parquet`` file is also accepted, which makes a directory of
+hand-made files usable as an offline stand-in for Google Sheets.
+"""
+import os
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pandas as pd
+
+# Default location of the snapshot store, next to the app
+DEFAULT_ROOT = Path(__file__).resolve().parent / "snapshots"
+
+# Number of versions kept per dataset
+DEFAULT_KEEP = 5
+
+VERSION_FORMAT = "%Y%m%dT%H%M%S%fZ"
+
+
+def _parquet_safe(df):
+    """
+    Return a copy of df that Parquet can store.
+
+    Sheet columns often mix numbers and text (e.g. "1,234" next to 56.0), which
+    Parquet rejects, so mixed object columns are stored as text.
+    """
+    df = df.copy()
+    df.columns = [str(col) for col in df.columns]
+    for col in df.columns:
+        if df[col].dtype == object:
+            values = df[col].dropna()
+            if values.map(type).nunique() > 1:
+                df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    return df
+
+
+class SnapshotStore:
+    """
+    Versioned Parquet files for each dataset under a root directory.
+    """
+
+    def __init__(self, root=None, keep=DEFAULT_KEEP):
+        self.root = Path(root or os.environ.get("EBI_SNAPSHOT_DIR") or DEFAULT_ROOT)
+        self.keep = keep
+
+    def versions(self, dataset):
+        """
+        Return the snapshot files for a dataset, oldest first.
+        """
+        folder = self.root / dataset
+        if not folder.is_dir():
+            return []
+        return sorted(folder.glob("*.parquet"))
+
+    def latest(self, dataset):
+        """
+        Return the path of the newest snapshot for a dataset, or None.
+        """
+        versions = self.versions(dataset)
+        if versions:
+            return versions[-1]
+        flat = self.root / f"{dataset}.parquet"
+        return flat if flat.is_file() else None
+
+    def age(self, dataset):
+        """
+        Seconds since the newest snapshot was written, or None if there is none.
+        """
+        path = self.latest(dataset)
+        if path is None:
+            return None
+        return time.time() - path.stat().st_mtime
+
+    def load(self, dataset, version=None):
+        """
+        Read a snapshot (the latest one unless a version path is given).
+        """
+        path = version or self.latest(dataset)
+        if path is None:
+            raise FileNotFoundError(f"No snapshot for '{dataset}' in {self.root}")
+        return pd.read_parquet(path)
+
+    def save(self, dataset, df):
+        """
+        Write df as a new snapshot version and prune old versions.
+        """
+        folder = self.root / dataset
+        folder.mkdir(parents=True, exist_ok=True)
+        version = datetime.now(timezone.utc).strftime(VERSION_FORMAT)
+        path = folder / f"{version}.parquet"
+        # Write to a temp file first so readers never see a partial snapshot
+        tmp_path = path.with_suffix(".parquet.tmp")
+        _parquet_safe(df).to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+        self.prune(dataset)
+        return path
+
+    def prune(self, dataset):
+        """
+        Delete all but the newest `keep` versions of a dataset.
+        """
+        for path in self.versions(dataset)[:-self.keep]:
+            path.unlink(missing_ok=True)
+
+
+if __name__ == "__main__":
+    # Refresh every snapshot from the live sheets, e.g. from a cron job:
+    #   python snapshots.py
+    import data
+
+    for dataset in data.CONNECTIONS:
+        started = time.perf_counter()
+        df = data.refresh_snapshot(dataset)
+        print(f"{dataset}: {len(df)} rows ({time.perf_counter() - started:.2f}s)")
@@ -1,5 +1,7 @@
 import streamlit as st
 
+import warmup
+
 st.set_page_config(
     page_title="Hello",
     page_icon="👋",
@@ -9,6 +11,9 @@ st.write("# EBI Data Dashboard 👋")
 
 st.sidebar.success("Select a page above.")
 
+# Load every sheet into the shared cache in the background while the user picks a page
+warmup.show_status(warmup.start())
+
 st.markdown(
     """
     📊 This dashboard displays data from the Energy Biosciences Institute (EBI) research projects.
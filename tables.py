@@ -0,0 +1,205 @@
+"""
+Derived tables used by the dashboard pages.
+
+Every table here is declared on `graph` with its inputs, so it is rebuilt only
+when one of the sheets it depends on changes. Widget values (year sliders,
+chart types, ...) are never inputs: pages slice these tables instead.
+"""
+import pandas as pd
+
+import berkeley
+import cases
+import data
+import deliverables
+import forecast
+from companies import CompanyIndex
+from crosswalk import PICrosswalk
+from funding import FundingAnalytics
+from names import dashboard_resolver, ip_resolver
+from patents import PatentBitmaps, PatentCube
+from portfolio import Portfolio
+from pipeline import Graph
+from search import SearchIndex
+
+graph = Graph()
+
+graph.source("dashboard", data.load_dashboard, version=data.data_version)
+graph.source("funding", data.load_funding, version=data.data_version)
+graph.source("admin", data.load_admin, version=data.data_version)
+graph.source("ip", data.load_ip, version=data.data_version)
+graph.source("berkeley", data.load_berkeley, version=data.data_version)
+graph.source("ebi2", data.load_ebi2, version=data.data_version)
+# Cases submitted from the IP page that aren't in the IP sheet yet
+graph.source("local_cases", cases.load_pending)
+
+get = graph.get
+
+
+# This function removes duplicate projects and consolidates Principle Investigator names
+def unique_projects(df):
+    # Remove duplicate rows based on "Project Name"
+    df = df.drop_duplicates(subset=["Project Name"], keep="first")
+
+    # First, fill NaN values with a placeholder or remove rows with NaN PIs
+    return df.dropna(subset=['Principle Investigator']).copy()  # Remove rows where PI is NaN
+
+
+@graph.table("projects", inputs=["dashboard"])
+def consolidate_data(df):
+    df = unique_projects(df)
+
+    # Unify PI name spellings across the dashboard sheet
+    df['Principle Investigator'] = dashboard_resolver.canonicalize(df['Principle Investigator'])
+
+    # Drop categories left without rows so counts and groupings skip them
+    for col in df.select_dtypes("category").columns:
+        df[col] = df[col].cat.remove_unused_categories()
+    return df
+
+
+@graph.table("pi_name_matches", inputs=["dashboard"])
+def pi_name_matches(df):
+    # How each dashboard PI spelling was resolved, for the debug view
+    return dashboard_resolver.resolve(unique_projects(df)['Principle Investigator'])
+
+
+@graph.table("search_index", inputs=["projects"])
+def project_search_index(df):
+    # Inverted index for the project search box
+    return SearchIndex(df)
+
+
+@graph.table("patents", inputs=["ip", "local_cases"])
+def clean_ip_data(df, local_cases):
+    # IP sheet rows plus locally submitted cases not synced to the sheet yet
+    if local_cases.empty:
+        df = df.copy()
+    else:
+        categories = df.select_dtypes("category").columns
+        df = pd.concat([df, local_cases], ignore_index=True)
+        # Concatenating categoricals with different categories gives objects
+        df[categories] = df[categories].astype("category")
+
+    # IP rows with PI name spellings unified across the IP sheet
+    df['PI'] = ip_resolver.canonicalize(df['PI'])
+    return df
+
+
+@graph.table("patent_cube", inputs=["patents"])
+def patent_cube(df):
+    # Distinct patent counts by every dimension the IP page charts
+    return PatentCube(df)
+
+
+@graph.table("patent_bitmaps", inputs=["patents"])
+def patent_bitmaps(df):
+    # Row bitsets per dimension value, for cross-filtering the IP page
+    return PatentBitmaps(df)
+
+
+@graph.table("productivity", inputs=["dashboard"])
+def productivity_data(df):
+    # Dashboard rows with the PI's last name, used to join against the funding sheet
+    df = df.copy()
+    df['Last_Name'] = df['Principle Investigator'].str.split().str[-1]
+    return df
+
+
+@graph.table("deliverables", inputs=["productivity"])
+def deliverables_data(df):
+    # Deliverable counts per project, parsed from the free-text column once per refresh
+    return deliverables.project_deliverables(df)
+
+
+@graph.table("finance", inputs=["funding"])
+def load_finance_data(df):
+    # Remove rows after the actual data (notes, totals, etc.)
+    df = df[df['Type'].notna()]  # Keep only rows with a valid Type
+
+    # Fill missing amounts with 0 (amounts are already numeric from ingest)
+    amount_columns = df.select_dtypes("number").columns
+    return df.fillna({col: 0 for col in amount_columns})
+
+
+@graph.table("crosswalk", inputs=["projects"])
+def pi_crosswalk(projects_df):
+    # Funding-sheet PI (last name) -> person record from the projects sheet
+    return PICrosswalk(projects_df)
+
+
+@graph.table("funding_analytics", inputs=["finance", "crosswalk"])
+def funding_analytics(finance_df, crosswalk):
+    return FundingAnalytics(finance_df, crosswalk)
+
+
+@graph.table("program_funding", inputs=["funding_analytics"])
+def analyze_program_funding(analytics):
+    # Total funding and number of funded PIs per discipline
+    return analytics.summary('Discipline')
+
+
+@graph.table("time_series", inputs=["funding_analytics"])
+def time_series_data(analytics):
+    # One row per discipline and year, for the funding time series chart
+    return analytics.yearly('Discipline')
+
+
+@graph.table("institution_funding", inputs=["funding_analytics"])
+def analyze_institution_funding(analytics):
+    # Funding per institution in the BP (2008-2015) and Shell (2016-2024) eras
+    return analytics.era_totals('Institution')
+
+
+@graph.table("company_index", inputs=["ebi2"])
+def company_search_index(df):
+    # Type-ahead index for the Company Details search box
+    return CompanyIndex(df)
+
+
+@graph.table("portfolio", inputs=["ebi2"])
+def portfolio_rollups(df):
+    # Rollups by industry, founding year and financing stage, sliced by the page filters
+    return Portfolio(df)
+
+
+@graph.table("berkeley_funding", inputs=["berkeley"])
+def clean_berkeley_data(df):
+    return berkeley.clean(df)
+
+
+@graph.table("berkeley_index", inputs=["berkeley_funding"])
+def berkeley_line_items(df):
+    # Line items keyed by (Legend, Source), with their years as a matrix
+    return berkeley.BerkeleyIndex(df)
+
+
+@graph.table("berkeley_long", inputs=["berkeley_index"])
+def melt_berkeley_data(index):
+    # One row per line item and year, sorted by year; pages slice this by year range
+    return berkeley.to_long(index)
+
+
+@graph.table("berkeley_history", inputs=["berkeley_long"])
+def berkeley_history(long):
+    # Actuals of the lookback line items (no NSF grants or bookkeeping rows)
+    return long[berkeley.in_lookback(long) & (long['Year'] <= berkeley.LAST_ACTUAL_YEAR)].reset_index(drop=True)
+
+
+@graph.table("berkeley_forecast", inputs=["berkeley_long"])
+def berkeley_forecast(long):
+    # Forecast years of every line item except bookkeeping rows
+    rows = ~long['Source'].isin(berkeley.EXCLUDED_SOURCES) & (long['Year'] > berkeley.LAST_ACTUAL_YEAR)
+    return long[rows].reset_index(drop=True)
+
+
+@graph.table("berkeley_source_totals", inputs=["berkeley_index"])
+def berkeley_source_totals(index):
+    # Prefix sums per lookback source, for year-range totals
+    return berkeley.source_totals(index)
+
+
+@graph.table("forecast_model", inputs=["berkeley_index"])
+def forecast_model(index):
+    # Growth and trend fitted per line item, for the simulated outlook
+    yearly = index.frame()
+    return forecast.ForecastModel(yearly[index.funded & ~index.sources.isin(berkeley.EXCLUDED_SOURCES)])
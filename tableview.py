@@ -0,0 +1,108 @@
+"""
+Paged table viewer for large frames.
+
+st.dataframe sends the whole frame to the browser. paged_table keeps the frame
+on the server and sends one page of rows at a time, limited to the chosen
+columns and with long text cut short. Filtering, sorting and paging happen on
+the server, and the full contents of a row are shown when it is selected.
+"""
+import math
+
+import pandas as pd
+import streamlit as st
+
+PAGE_SIZES = [25, 50, 100]
+
+# Longest text shown in a table cell; the full text is shown on selection
+MAX_CHARS = 80
+
+
+def truncate(df, max_chars=MAX_CHARS):
+    """
+    Cut text cells longer than max_chars, marking the cut with an ellipsis.
+    """
+    df = df.copy()
+    for col in df.select_dtypes(include=["object", "string", "category"]).columns:
+        text = df[col].astype("string")
+        long = text.str.len() > max_chars
+        if long.any():
+            df[col] = text.where(~long, text.str.slice(0, max_chars - 1) + "…")
+    return df
+
+
+def filter_rows(df, query, columns):
+    """
+    Rows where any of the given columns contains query (case-insensitive).
+    """
+    query = query.strip().lower()
+    if not query:
+        return df
+    mask = pd.Series(False, index=df.index)
+    for col in columns:
+        mask |= df[col].astype("string").str.lower().str.contains(query, regex=False, na=False)
+    return df[mask]
+
+
+@st.fragment
+def paged_table(df, key, columns=None, page_size=PAGE_SIZES[0], max_chars=MAX_CHARS):
+    """
+    Show df one page at a time with server-side column choice, filter and sort.
+
+    `key` must be unique on the page; `columns` are the columns shown at first.
+    """
+    all_columns = [str(col) for col in df.columns]
+    df = df.set_axis(all_columns, axis=1)
+
+    with st.expander("Table options"):
+        col1, col2, col3 = st.columns([2, 1, 1])
+        with col1:
+            shown = st.multiselect(
+                "Columns", all_columns,
+                default=[str(col) for col in columns] if columns else all_columns,
+                key=f"{key}_columns"
+            ) or all_columns
+        with col2:
+            sort_by = st.selectbox("Sort by", ["(sheet order)"] + shown, key=f"{key}_sort")
+        with col3:
+            descending = st.toggle("Descending", key=f"{key}_descending")
+        query = st.text_input("Filter rows", "", key=f"{key}_filter")
+
+    rows = filter_rows(df, query, shown)
+    if sort_by in shown:
+        rows = rows.sort_values(sort_by, ascending=not descending, kind="stable", na_position="last")
+
+    col1, col2, col3 = st.columns([1, 1, 2])
+    with col1:
+        size = st.selectbox(
+            "Rows per page", PAGE_SIZES,
+            index=PAGE_SIZES.index(page_size) if page_size in PAGE_SIZES else 0,
+            key=f"{key}_size"
+        )
+    pages = max(1, math.ceil(len(rows) / size))
+    # Filtering can leave fewer pages than the page last shown
+    if st.session_state.get(f"{key}_page", 1) > pages:
+        st.session_state[f"{key}_page"] = pages
+    with col2:
+        page = st.number_input("Page", min_value=1, max_value=pages, step=1, key=f"{key}_page")
+    with col3:
+        first = (page - 1) * size
+        st.caption(f"Rows {min(first + 1, len(rows))}-{min(first + size, len(rows))} of {len(rows)} "
+                   f"({len(df)} before filtering)")
+
+    # Only this page and these columns are sent to the browser
+    page_rows = rows.iloc[first:first + size]
+    event = st.dataframe(
+        truncate(page_rows[shown], max_chars),
+        use_container_width=True,
+        on_select="rerun",
+        selection_mode="single-row",
+        key=f"{key}_table"
+    )
+
+    # Full contents of the selected row, fetched only when a row is selected
+    selected = event.selection.rows if event else []
+    if selected and selected[0] < len(page_rows):
+        row = page_rows.iloc[selected[0]]
+        st.write("**Selected row**")
+        for col, value in row.items():
+            st.markdown(f"**{col}:** {'' if pd.isna(value) else value}")
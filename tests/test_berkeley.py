@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import berkeley
+
+
+@pytest.fixture
+def sheet():
+    return pd.DataFrame({
+        "Legend": ["EBI Squared", "EBI Squared", "Industrial", "Awarded grants"],
+        "Source": ["EBI Recharge", "EBI Squared", "Industrial Research Funds", "NSF grant"],
+        "2023": [1.0, 10.0, 0.0, 5.0],
+        "2024": [2.0, 20.0, 0.0, 6.0],
+        "2025": [3.0, 30.0, np.nan, 7.0],
+    })
+
+
+def test_rows_are_looked_up_by_key(sheet):
+    index = berkeley.BerkeleyIndex(berkeley.clean(sheet.iloc[::-1]))
+    squared, recharge = index.rows([("EBI Squared", "EBI Squared"), ("EBI Squared", "EBI Recharge")],
+                                   [2024, 2025, 2026])
+    assert squared.tolist() == [20.0, 30.0, 0.0]
+    assert recharge.tolist() == [2.0, 3.0, 0.0]
+
+
+def test_unfunded_line_item_reads_as_zeros(sheet):
+    index = berkeley.BerkeleyIndex(berkeley.clean(sheet))
+    assert index.series("Industrial", "Industrial Research Funds").tolist() == [0.0, 0.0, 0.0]
+    assert "Industrial Research Funds" not in berkeley.to_long(index)["Source"].tolist()
+
+
+def test_missing_line_item_raises(sheet):
+    index = berkeley.BerkeleyIndex(berkeley.clean(sheet))
+    with pytest.raises(KeyError, match="EBI2"):
+        index.rows([("EBI Squared", "EBI Squared"), ("EBI Squared", "EBI2")])
+
+
+def test_long_table_is_sorted_by_year_for_shuffled_columns(sheet):
+    shuffled = sheet[["Legend", "Source", "2025", "2023", "2024"]]
+    long = berkeley.to_long(berkeley.BerkeleyIndex(berkeley.clean(shuffled)))
+    assert long["Year"].is_monotonic_increasing
+    window = berkeley.year_slice(long, 2024, 2025)
+    assert sorted(window["Year"].unique()) == [2024, 2025]
+    assert window.loc[window["Source"] == "EBI Squared", "Funding"].tolist() == [20.0, 30.0]
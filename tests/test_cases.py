@@ -0,0 +1,116 @@
+import json
+
+import pandas as pd
+import pytest
+
+import cases
+
+
+class FakeSheet:
+    """
+    In-memory stand-in for WorksheetTarget.
+    """
+
+    def __init__(self, df):
+        self.df = df
+        self.appends = 0
+
+    def header(self):
+        return list(self.df.columns)
+
+    def column_values(self, column):
+        return self.df[column].astype(str).tolist() if column in self.df.columns else []
+
+    def append(self, rows):
+        # Rows must reach the sheet as plain JSON values, as gspread sends them
+        json.dumps(rows.astype(object).where(rows.notna(), "").to_numpy().tolist())
+        assert list(rows.columns) == self.header()
+        self.df = pd.concat([self.df, rows], ignore_index=True)
+        self.appends += 1
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = cases.CaseStore(tmp_path / "cases.db")
+    for number in range(3):
+        store.submit(case_no=f"2024-00{number}", title=f"Patent {number}", lead_inventor="Jay Keasling",
+                     us_app_date="2024-05-01", lead_sponsor="BP")
+    store.transition(["2024-000", "2024-001", "2024-002"], "approved")
+    return store
+
+
+@pytest.fixture
+def sheet():
+    return FakeSheet(pd.DataFrame({
+        "Patent Title": ["Existing patent"],
+        "PI": ["Jennifer Doudna"],
+        "Application_YR": [2019],
+        "Lead Sponsor": ["Shell"],
+    }))
+
+
+def test_sync_appends_only_new_rows_in_sheet_columns(store, sheet):
+    existing = sheet.df.copy()
+
+    assert store.sync(sheet, batch_size=2) == 3
+
+    assert sheet.appends == 2
+    assert list(sheet.df.columns) == list(existing.columns)
+    pd.testing.assert_frame_equal(sheet.df.iloc[:1], existing, check_dtype=False)
+    assert sheet.df["Patent Title"].tolist()[1:] == ["Patent 0", "Patent 1", "Patent 2"]
+    assert sheet.df["Application_YR"].tolist()[1:] == [2024, 2024, 2024]
+    assert store.status_counts() == {"synced": 3}
+
+
+def test_sync_rerun_after_failed_status_update_does_not_duplicate(store, sheet, monkeypatch):
+    transition = store.transition
+
+    def fail_once(*args, **kwargs):
+        monkeypatch.setattr(store, "transition", transition)
+        raise RuntimeError("crashed after the append")
+
+    monkeypatch.setattr(store, "transition", fail_once)
+    with pytest.raises(RuntimeError):
+        store.sync(sheet)
+    assert len(sheet.df) == 4
+
+    assert store.sync(sheet) == 0
+    assert len(sheet.df) == 4
+    assert store.status_counts() == {"synced": 3}
+
+
+PUBLIC_URL = "https://docs.google.com/spreadsheets/d/abc/edit?gid=42#gid=42"
+
+
+def test_open_worksheet_needs_a_service_account():
+    with pytest.raises(ValueError, match="service account"):
+        cases.open_worksheet({"spreadsheet": PUBLIC_URL})
+
+
+def test_open_worksheet_opens_the_tab_in_the_url(monkeypatch):
+    import gspread
+
+    opened = {}
+
+    class FakeSpreadsheet:
+        def get_worksheet_by_id(self, gid):
+            return f"tab {gid}"
+
+        def worksheet(self, title):
+            return f"tab {title}"
+
+    class FakeClient:
+        def open_by_url(self, url):
+            opened["url"] = url
+            return FakeSpreadsheet()
+
+    def service_account_from_dict(info):
+        opened["info"] = info
+        return FakeClient()
+
+    monkeypatch.setattr(gspread, "service_account_from_dict", service_account_from_dict)
+    config = {"type": "service_account", "client_email": "sync@example.com", "spreadsheet": PUBLIC_URL}
+
+    assert cases.open_worksheet(config) == "tab 42"
+    assert opened == {"url": PUBLIC_URL, "info": {"type": "service_account", "client_email": "sync@example.com"}}
+    assert cases.open_worksheet({**config, "worksheet": "Patents"}) == "tab Patents"
@@ -0,0 +1,45 @@
+import pandas as pd
+import pytest
+
+import filter
+
+
+@pytest.fixture
+def projects():
+    return pd.DataFrame({
+        "Project Name": ["B", "A", "B", "A", "C", "B"],
+        "Productivity and Deliverables": ["x", "longest", "longer", None, "c", "ties"],
+        "Notes": [None, None, None, None, "note", "more notes"],
+    })
+
+
+def test_in_memory_keeps_longest_row_without_mutating(projects):
+    before = projects.copy()
+    result = filter.filter_by_max_productivity(projects)
+    pd.testing.assert_frame_equal(projects, before)
+    assert result["Project Name"].tolist() == ["A", "B", "C"]
+    assert result["Productivity and Deliverables"].tolist() == ["longest", "longer", "c"]
+    assert result.index.tolist() == [1, 2, 4]
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".parquet"])
+@pytest.mark.parametrize("presorted", [False, True])
+def test_streaming_matches_in_memory(tmp_path, projects, suffix, presorted):
+    if presorted:
+        projects = projects.sort_values("Project Name", kind="stable", ignore_index=True)
+    source = tmp_path / f"export{suffix}"
+    output = tmp_path / f"filtered{suffix}"
+    if suffix == ".csv":
+        projects.to_csv(source, index=False)
+    else:
+        projects.to_parquet(source, index=False)
+
+    # Chunks of two rows: "Notes" is all null in the first chunk
+    rows_in, rows_out, _ = filter.stream_max_productivity(source, output, chunksize=2,
+                                                          presorted=presorted, log=None)
+
+    result = pd.read_csv(output) if suffix == ".csv" else pd.read_parquet(output)
+    expected = filter.filter_by_max_productivity(projects).reset_index(drop=True)
+    assert (rows_in, rows_out) == (6, 3)
+    result = result.sort_values("Project Name", ignore_index=True)
+    pd.testing.assert_frame_equal(result.astype(object).fillna(""), expected.astype(object).fillna(""))
@@ -0,0 +1,27 @@
+import numpy as np
+import pandas as pd
+
+import forecast
+
+
+def test_bands_keep_same_named_sources_under_different_legends_apart():
+    index = pd.MultiIndex.from_tuples(
+        [("Grants", "Federal"), ("Contracts", "Federal")], names=["Legend", "Source"]
+    )
+    # Year columns out of order; the base must still be the last actual year
+    yearly = pd.DataFrame([[120.0, 100.0, 110.0], [1200.0, 1000.0, 1100.0]],
+                          index=index, columns=[2024, 2022, 2023])
+    model = forecast.ForecastModel(yearly, last_actual_year=2024, horizon=2)
+    assert model.base.tolist() == [120.0, 1200.0]
+
+    values = forecast.simulate(model, paths=500, renewal=1.0)
+    out = forecast.bands(model, values)
+
+    assert list(out.drop_duplicates(["Legend", "Source"])[["Legend", "Source"]].itertuples(index=False, name=None)) == [
+        ("Total", "Total"), ("Grants", "Federal"), ("Contracts", "Federal")
+    ]
+    grants = out[(out["Legend"] == "Grants") & (out["Source"] == "Federal")]
+    contracts = out[(out["Legend"] == "Contracts") & (out["Source"] == "Federal")]
+    assert len(grants) == len(contracts) == 2
+    np.testing.assert_allclose(grants["P50"], np.median(values[:, 0], axis=0))
+    np.testing.assert_allclose(contracts["P50"], np.median(values[:, 1], axis=0))
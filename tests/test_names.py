@@ -0,0 +1,35 @@
+import random
+
+import pytest
+
+import names
+
+
+@pytest.fixture
+def resolver():
+    return names.NameResolver(overrides={})
+
+
+def test_spellings_of_one_person_are_merged(resolver):
+    out = resolver.resolve(["Jay Keasling", "Jay D. Keasling", "Jay Kiesling", "Jennifer Doudna", "J. Doudna"])
+
+    assert set(out.loc[["Jay Keasling", "Jay Kiesling"], "canonical"]) == {"Jay D. Keasling"}
+    assert out.loc["J. Doudna", "canonical"] == "Jennifer Doudna"
+
+
+def test_a_shared_surname_is_not_enough(resolver):
+    people = ["Geg Johnson", "Exqg Johnson", "Grace Johnson", "Gregory Johnson", "Jane Keasling", "Jay Keasling"]
+    out = resolver.resolve(people + ["J. Keasling"])
+
+    assert (out.loc[people, "canonical"] == people).all()
+    # Equally close to Jane and Jay
+    assert out.loc["J. Keasling", "method"] == "new"
+
+
+def test_result_does_not_depend_on_input_order(resolver):
+    spellings = ["Jay Keasling", "Jay Kiesling", "Keasling", "J. Keasling", "Harvey Blanch", "Harvey Blanc"]
+    expected = resolver.alias_map(spellings)
+    shuffled = spellings[:]
+    random.Random(0).shuffle(shuffled)
+
+    assert names.NameResolver(overrides={}).alias_map(shuffled) == expected
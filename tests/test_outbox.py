@@ -0,0 +1,140 @@
+import json
+import sqlite3
+import time
+
+import pytest
+
+import outbox
+
+
+class Clock:
+    """
+    Stands in for the time module in outbox, with a settable time().
+    """
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+    def perf_counter(self):
+        return time.perf_counter()
+
+
+class FailingTransport:
+    def __init__(self):
+        self.calls = 0
+
+    def send(self, messages):
+        self.calls += 1
+        return {message["id"]: "mailbox unavailable" for message in messages}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(outbox, "time", clock)
+    return clock
+
+
+def rows(box):
+    with sqlite3.connect(box.db_path) as db:
+        db.row_factory = sqlite3.Row
+        return [dict(row) for row in db.execute("SELECT * FROM outbox ORDER BY id")]
+
+
+def test_enqueued_messages_are_sent_on_flush(tmp_path, clock):
+    mail = tmp_path / "sent_mail.jsonl"
+    box = outbox.Outbox(outbox.FileTransport(mail), db_path=tmp_path / "outbox.db", batch_size=2)
+    ids = [box.enqueue(f"pi{i}@berkeley.edu", f"Case {i}", "Please review") for i in range(3)]
+
+    clock.now += 5
+    assert box.flush() == 3
+
+    sent = [json.loads(line) for line in mail.read_text().splitlines()]
+    assert [message["id"] for message in sent] == ids
+    assert sent[0]["recipient"] == sent[0]["sender"] == "pi0@berkeley.edu"
+    assert [(row["status"], row["attempts"], row["sent"]) for row in rows(box)] == [("sent", 1, 1005.0)] * 3
+    assert box.flush() == 0
+
+
+def test_failed_sends_back_off_exponentially(tmp_path, clock):
+    transport = FailingTransport()
+    box = outbox.Outbox(transport, db_path=tmp_path / "outbox.db", retry_delay=30, max_attempts=10)
+    box.enqueue("pi@berkeley.edu", "Case", "Please review")
+
+    next_attempts = []
+    for _ in range(3):
+        assert box.flush() == 0
+        (row,) = rows(box)
+        next_attempts.append(row["next_attempt"] - clock.now)
+        # Not due again until the delay has passed
+        clock.now = row["next_attempt"] - 1
+        box.flush()
+        clock.now += 1
+    assert next_attempts == [30, 60, 120]
+    assert transport.calls == 3
+    assert row["status"] == "pending" and row["last_error"] == "mailbox unavailable"
+
+
+def test_message_fails_after_max_attempts(tmp_path, clock):
+    transport = FailingTransport()
+    box = outbox.Outbox(transport, db_path=tmp_path / "outbox.db", retry_delay=1, max_attempts=3)
+    box.enqueue("pi@berkeley.edu", "Case", "Please review")
+
+    for _ in range(5):
+        box.flush()
+        clock.now += 3600
+
+    (row,) = rows(box)
+    assert (row["status"], row["attempts"]) == ("failed", 3)
+    assert transport.calls == 3
+
+
+def test_a_transport_error_fails_the_whole_batch(tmp_path, clock):
+    class Down:
+        def send(self, messages):
+            raise ConnectionError("mail server down")
+
+    box = outbox.Outbox(Down(), db_path=tmp_path / "outbox.db")
+    box.enqueue("a@berkeley.edu", "Case", "Please review")
+    box.enqueue("b@berkeley.edu", "Case", "Please review")
+
+    assert box.flush() == 0
+    assert [(row["status"], row["last_error"]) for row in rows(box)] == [("pending", "mail server down")] * 2
+
+
+def test_stats(tmp_path, clock):
+    box = outbox.Outbox(outbox.FileTransport(tmp_path / "sent_mail.jsonl"), db_path=tmp_path / "outbox.db",
+                        max_attempts=1)
+    assert box.stats() == {"pending": 0, "sent": 0, "failed": 0, "delivery_latency": None, "send_latency": None}
+
+    box.enqueue("a@berkeley.edu", "Case", "Please review")
+    clock.now += 2
+    box.enqueue("b@berkeley.edu", "Case", "Please review")
+    clock.now += 2
+    box.flush()
+    box.transport = FailingTransport()
+    box.enqueue("c@berkeley.edu", "Case", "Please review")
+    box.flush()
+    box.enqueue("d@berkeley.edu", "Case", "Please review")
+
+    stats = box.stats()
+    assert {key: stats[key] for key in ("pending", "sent", "failed")} == {"pending": 1, "sent": 2, "failed": 1}
+    # Enqueued 4s and 2s before they were sent
+    assert stats["delivery_latency"] == 3.0
+    assert stats["send_latency"] >= 0
+
+
+def test_worker_sends_messages_as_they_are_enqueued(tmp_path, monkeypatch):
+    monkeypatch.setattr(outbox, "POLL_INTERVAL", 60)
+    box = outbox.Outbox(outbox.FileTransport(tmp_path / "sent_mail.jsonl"), db_path=tmp_path / "outbox.db")
+    box.start()
+
+    for i in range(3):
+        box.enqueue(f"pi{i}@berkeley.edu", "Case", "Please review")
+        deadline = time.monotonic() + 5
+        while box.stats()["sent"] <= i and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert box.stats()["sent"] == i + 1
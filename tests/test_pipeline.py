@@ -0,0 +1,30 @@
+import pandas as pd
+
+import pipeline
+
+
+def test_source_is_hashed_once_per_data_version(monkeypatch):
+    frame = pd.DataFrame({"a": [1, 2, 3]})
+    frame.attrs["data_version"] = "v1"
+    graph = pipeline.Graph()
+    graph.source("raw", lambda: frame.copy(), version=lambda df: df.attrs.get("data_version"))
+
+    @graph.table("doubled", inputs=["raw"])
+    def doubled(df):
+        return df * 2
+
+    hashed = []
+    fingerprint = pipeline.fingerprint
+    monkeypatch.setattr(pipeline, "fingerprint", lambda value: hashed.append(value) or fingerprint(value))
+
+    first = graph.version("doubled")
+    sources_hashed = sum(isinstance(value, pd.DataFrame) for value in hashed)
+    assert graph.version("doubled") == first
+    assert sum(isinstance(value, pd.DataFrame) for value in hashed) == sources_hashed == 1
+
+    # A new fetch with the same content gets a new token, is hashed again, and isn't rebuilt
+    frame.attrs["data_version"] = "v2"
+    assert graph.version("doubled") == first
+    assert sum(isinstance(value, pd.DataFrame) for value in hashed) == 2
+    graph.get("doubled")
+    assert graph.builds["doubled"] == 1
@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import portfolio
+
+
+@pytest.fixture
+def companies():
+    return pd.DataFrame({
+        "Company": ["Alpha", "Beta", "Gamma"],
+        "Primary Industry Code": ["Biotech", "Energy", "Biotech"],
+        "Year Founded": [2015.0, 2019.0, np.nan],
+        "Last Financing Deal Type": ["Seed", "Series A", "Seed"],
+        "Total Raised": [5.0, 20.0, 1.0],
+        "Employees": [10.0, 40.0, 3.0],
+    })
+
+
+@pytest.mark.parametrize("founded", ["missing", "blank"])
+def test_portfolio_without_founding_years(companies, founded):
+    if founded == "missing":
+        companies = companies.drop(columns="Year Founded")
+    else:
+        companies["Year Founded"] = np.nan
+    rollups = portfolio.Portfolio(companies)
+
+    assert rollups.founded_range == (None, None)
+    assert np.isnan(rollups.cell_years).all()
+    totals = rollups.totals(rollups.select(["Biotech"]))
+    assert totals["Companies"] == 2
+    assert totals["First Founded"] is None
+    assert rollups.rollup("Primary Industry Code")["Companies"].to_dict() == {"Biotech": 2, "Energy": 1}
+
+
+def test_cells_without_founding_year_are_left_out_of_year_filters(companies):
+    rollups = portfolio.Portfolio(companies)
+
+    assert rollups.founded_range == (2015, 2019)
+    assert rollups.totals(rollups.select(years=(2010, 2020)))["Companies"] == 2
+    assert rollups.totals()["First Founded"] == 2015
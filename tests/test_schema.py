@@ -0,0 +1,21 @@
+import pandas as pd
+
+import schema
+
+
+def test_whole_dollar_money_stays_float64():
+    sheet = pd.DataFrame({
+        "Company": ["Alpha", "Beta"],
+        "Total Raised": ["$100", "$120"],
+        "Last Financing Size": ["100", "-"],
+        "Employees": ["12", "1,200"],
+        "Year Founded": ["2015", "2019"],
+    })
+    df = schema.ingest("ebi2", sheet)
+
+    assert df["Total Raised"].dtype == df["Last Financing Size"].dtype == "float64"
+    assert (df["Total Raised"] + df["Total Raised"]).tolist() == [200.0, 240.0]
+    assert df["Last Financing Size"].tolist() == [100.0, 0.0]
+    # Counts and years are still compacted
+    assert df["Employees"].dtype == "Int16"
+    assert df["Year Founded"].dtype == "Int16"
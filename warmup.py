@@ -0,0 +1,89 @@
+"""
+Background warm-up of the shared data cache.
+
+The home page and every page start (once per cache period) a thread pool that
+loads every configured dataset into the cache concurrently, so the first visit
+to a page doesn't pay for its sheet reads one after another, even when a page
+is opened directly.
+"""
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import streamlit as st
+
+import data
+
+logger = logging.getLogger(__name__)
+
+STATUS_ICONS = {
+    "pending": "⏳",
+    "loading": "🔄",
+    "ready": "✅",
+    "failed": "❌",
+}
+
+
+class Warmup:
+    """
+    Loads datasets into the data cache on a thread pool and tracks their status.
+    """
+
+    def __init__(self, datasets, max_workers=None):
+        self.status = {dataset: "pending" for dataset in datasets}
+        self.elapsed = {}
+        self.errors = {}
+        # Dataset -> {"before": bytes, "after": bytes} from ingest
+        self.memory = {}
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or len(self.status) or 1,
+            thread_name_prefix="warmup",
+        )
+        self.futures = {
+            dataset: self._executor.submit(self._load, dataset)
+            for dataset in self.status
+        }
+        self._executor.shutdown(wait=False)
+
+    def _load(self, dataset):
+        self.status[dataset] = "loading"
+        started = time.perf_counter()
+        try:
+            df = data.load_dataset(dataset)
+            self.memory[dataset] = df.attrs.get("memory")
+            self.status[dataset] = "ready"
+        except Exception as e:
+            self.status[dataset] = "failed"
+            self.errors[dataset] = str(e)
+            logger.exception("Warm-up of '%s' failed", dataset)
+        finally:
+            self.elapsed[dataset] = time.perf_counter() - started
+
+    @property
+    def done(self):
+        return all(future.done() for future in self.futures.values())
+
+
+@st.cache_resource(ttl=data.CACHE_TTL, show_spinner=False)
+def start():
+    """
+    Start warming every dataset, once per server process and cache period.
+    """
+    return Warmup(data.CONNECTIONS)
+
+
+def show_status(warmup):
+    """
+    Show per-sheet warm-up status in the sidebar.
+    """
+    with st.sidebar.expander("Data status", expanded=not warmup.done):
+        for dataset, status in warmup.status.items():
+            line = f"{STATUS_ICONS[status]} {data.CONNECTIONS[dataset]}"
+            if dataset in warmup.elapsed:
+                line += f" ({warmup.elapsed[dataset]:.1f}s)"
+            if warmup.memory.get(dataset):
+                memory = warmup.memory[dataset]
+                line += f", {memory['before'] / 1024:,.0f} KB → {memory['after'] / 1024:,.0f} KB"
+            st.caption(line)
+            if dataset in warmup.errors:
+                st.caption(f"⚠️ {warmup.errors[dataset]}")